@@ -0,0 +1,134 @@
+import random
+import uuid
+import json
+import os
+
+# same ids as the FIFA World Cup 2018 in the StatsBomb open data
+COMPETITION_ID = 43
+SEASON_ID = 3
+
+EVENT_TYPES = ["Pass", "Pass", "Pass", "Ball Receipt*", "Carry", "Pressure", "Shot",
+               "Dribble", "Foul Committed", "Foul Won", "Interception", "Duel", "Clearance"]
+TEAM_NAMES = ["France", "Croatia", "Brazil", "Belgium", "England", "Uruguay", "Russia", "Sweden"]
+
+def team_players(team_id: int, team_name: str) -> list[tuple[int, str]]:
+    return [(team_id * 100 + i, f"{team_name} Player {i}") for i in range(1, 15)]
+
+def competitions() -> list[dict]:
+    return [{
+        "competition_id": COMPETITION_ID, "season_id": SEASON_ID, "country_name": "International",
+        "competition_name": "FIFA World Cup", "competition_gender": "male", "competition_youth": False,
+        "competition_international": True, "season_name": "2018", "match_updated": "2023-01-01T00:00:00",
+        "match_updated_360": None, "match_available_360": None, "match_available": "2023-01-01T00:00:00",
+    }]
+
+def match(match_id: int, home: tuple[int, str], away: tuple[int, str], rng: random.Random) -> dict:
+    return {
+        "match_id": match_id, "match_date": "2018-07-15", "kick_off": "17:00:00.000",
+        "competition": {"competition_id": COMPETITION_ID, "country_name": "International", "competition_name": "FIFA World Cup"},
+        "season": {"season_id": SEASON_ID, "season_name": "2018"},
+        "home_team": {"home_team_id": home[0], "home_team_name": home[1], "managers": [{"id": home[0], "name": f"{home[1]} Coach"}]},
+        "away_team": {"away_team_id": away[0], "away_team_name": away[1], "managers": [{"id": away[0], "name": f"{away[1]} Coach"}]},
+        "home_score": rng.randint(0, 4), "away_score": rng.randint(0, 4), "match_status": "available",
+        "metadata": {"data_version": "1.1.0"}, "match_week": 1, "competition_stage": {"id": 26, "name": "Group Stage"},
+        "stadium": {"id": 1, "name": "Luzhniki Stadium"}, "referee": {"id": 1, "name": "Referee"},
+    }
+
+def lineup(team: tuple[int, str]) -> dict:
+    players = []
+    for j, (player_id, player_name) in enumerate(team_players(*team)):
+        if j < 11:
+            position = {"position_id": j + 1, "position": "Center Back", "from": "00:00", "to": None, "from_period": 1,
+                        "to_period": None, "start_reason": "Starting XI", "end_reason": "Final Whistle"}
+        else:
+            position = {"position_id": j + 1, "position": "Center Forward", "from": "70:00", "to": None, "from_period": 2,
+                        "to_period": None, "start_reason": "Substitution - On", "end_reason": "Final Whistle"}
+        players.append({"player_id": player_id, "player_name": player_name, "player_nickname": None,
+                        "jersey_number": j + 1, "country": {"id": 1, "name": team[1]}, "cards": [],
+                        "positions": [position] if j < 12 else []})
+    return {"team_id": team[0], "team_name": team[1], "lineup": players}
+
+def event(index: int, minute: int, team: tuple[int, str], rng: random.Random, **attributes) -> dict:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "index": index, "period": 1 if minute < 45 else 2,
+        "timestamp": f"00:{minute % 45:02d}:00.000", "minute": minute, "second": rng.randint(0, 59),
+        "possession": index // 10, "possession_team": {"id": team[0], "name": team[1]},
+        "play_pattern": {"id": 1, "name": "Regular Play"}, "team": {"id": team[0], "name": team[1]},
+        **attributes,
+    }
+
+def match_events(home: tuple[int, str], away: tuple[int, str], n_events: int, rng: random.Random) -> list[dict]:
+    """
+    A plausible event stream: starting XIs, random on-ball events with their
+    outcomes, and one substitution per team at 70'
+    """
+    players = {team: team_players(*team)[:11] for team in (home, away)}
+    events = [
+        event(k + 1, 0, team, rng, type={"id": 35, "name": "Starting XI"}, duration=0.0, tactics={
+            "formation": 442,
+            "lineup": [{"player": {"id": pid, "name": name}, "position": {"id": 1, "name": "Center Back"}, "jersey_number": j + 1}
+                       for j, (pid, name) in enumerate(players[team])],
+        })
+        for k, team in enumerate((home, away))
+    ]
+    for i in range(n_events):
+        team = rng.choice((home, away))
+        player_id, player_name = rng.choice(players[team])
+        event_type = rng.choice(EVENT_TYPES)
+        attributes = {"type": {"id": 30, "name": event_type}, "player": {"id": player_id, "name": player_name},
+                      "position": {"id": 1, "name": "Center Back"},
+                      "location": [rng.uniform(0, 120), rng.uniform(0, 80)], "duration": 0.5}
+        if event_type == "Pass":
+            recipient = rng.choice(players[team])
+            attributes["pass"] = {"recipient": {"id": recipient[0], "name": recipient[1]}, "length": 10.0, "angle": 0.1,
+                                  "height": {"id": 1, "name": "Ground Pass"},
+                                  "end_location": [rng.uniform(0, 120), rng.uniform(0, 80)]}
+            if rng.random() < 0.2:
+                attributes["pass"]["outcome"] = {"id": 9, "name": "Incomplete"}
+            if rng.random() < 0.02:
+                attributes["pass"]["shot_assist"] = True
+        elif event_type == "Shot":
+            attributes["shot"] = {"statsbomb_xg": rng.random() * 0.4, "end_location": [120, 40, 1],
+                                  "outcome": {"id": 97, "name": rng.choice(["Goal", "Saved", "Off T", "Blocked"])},
+                                  "type": {"id": 87, "name": "Open Play"}, "body_part": {"id": 40, "name": "Right Foot"}}
+        elif event_type == "Dribble":
+            attributes["dribble"] = {"outcome": {"id": 8, "name": rng.choice(["Complete", "Incomplete"])}}
+        elif event_type == "Foul Committed" and rng.random() < 0.2:
+            attributes["foul_committed"] = {"card": {"id": 7, "name": "Yellow Card"}}
+        if rng.random() < 0.1:
+            attributes["under_pressure"] = True
+        events.append(event(i + 3, i * 95 // n_events, team, rng, **attributes))
+    for k, team in enumerate((home, away)):
+        off, on = team_players(*team)[10], team_players(*team)[11]
+        events.append(event(n_events + 3 + k, 70, team, rng, type={"id": 19, "name": "Substitution"},
+                            player={"id": off[0], "name": off[1]},
+                            substitution={"outcome": {"id": 103, "name": "Tactical"}, "replacement": {"id": on[0], "name": on[1]}}))
+    return events
+
+def generate(root: str, n_matches: int = 4, n_events: int = 3500, seed: int = 1) -> str:
+    """
+    Write a deterministic season in the layout of the StatsBomb open-data
+    repository (data/competitions.json, data/matches, data/lineups, data/events),
+    to be read through STATSBOMB_OPEN_DATA_DIR
+
+    Returns the root directory.
+    """
+    rng = random.Random(seed)
+    data = os.path.join(root, "data")
+    for folder in [os.path.join("matches", str(COMPETITION_ID)), "lineups", "events"]:
+        os.makedirs(os.path.join(data, folder), exist_ok=True)
+    teams = list(enumerate(TEAM_NAMES, start=1))
+    matches = []
+    for k in range(n_matches):
+        match_id = 1000 + k + 1
+        home, away = teams[(2 * k) % len(teams)], teams[(2 * k + 1) % len(teams)]
+        matches.append(match(match_id, home, away, rng))
+        with open(os.path.join(data, "lineups", f"{match_id}.json"), "w", encoding="utf-8") as f:
+            json.dump([lineup(home), lineup(away)], f)
+        with open(os.path.join(data, "events", f"{match_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(match_events(home, away, n_events, rng), f)
+    with open(os.path.join(data, "competitions.json"), "w", encoding="utf-8") as f:
+        json.dump(competitions(), f)
+    with open(os.path.join(data, "matches", str(COMPETITION_ID), f"{SEASON_ID}.json"), "w", encoding="utf-8") as f:
+        json.dump(matches, f)
+    return root
@@ -0,0 +1,291 @@
+"""
+Benchmarks of the data and serving hot paths, on generated StatsBomb fixtures
+(or a local open-data checkout) with stubbed LLMs and web search: no network.
+
+Run from the repository root:
+
+    python benchmarks/run.py --output results.json
+
+Results are written as JSON (latencies in milliseconds, memory in KiB) so they
+can be compared between commits.
+"""
+from datetime import datetime, timezone
+from contextlib import redirect_stdout
+import subprocess
+import statistics
+import tracemalloc
+import platform
+import argparse
+import tempfile
+import asyncio
+import time
+import json
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the data and serving hot paths")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--suites", default="startup,data,api,agent", help="comma separated suites to run: startup, data, api, agent")
+    parser.add_argument("--fixtures", help="an open-data checkout to use instead of generated fixtures")
+    parser.add_argument("--competition-id", type=int, default=43)
+    parser.add_argument("--season-id", type=int, default=3)
+    parser.add_argument("--matches", type=int, default=4, help="matches in the generated fixtures")
+    parser.add_argument("--events", type=int, default=3500, help="events per match in the generated fixtures")
+    parser.add_argument("--repeats", type=int, default=20, help="warm runs of each data function")
+    parser.add_argument("--cold-repeats", type=int, default=3, help="runs of each data function with empty caches")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route in the load test")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients in the load test")
+    parser.add_argument("--turns", type=int, default=5, help="agent turns")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the LLM stub waits per call")
+    return parser.parse_args()
+
+def setup_environment(args) -> str:
+    """
+    Point every cache and data source of the app to a scratch directory,
+    before the app modules read their settings at import time
+    """
+    workdir = tempfile.mkdtemp(prefix="soccer_stats_bench_")
+    if args.fixtures is None:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from fixtures import generate
+        args.fixtures = generate(os.path.join(workdir, "open-data"), n_matches=args.matches, n_events=args.events)
+    os.environ.update({
+        "STATSBOMB_OPEN_DATA_DIR": args.fixtures,
+        "SOCCER_STATS_CACHE_DIR": os.path.join(workdir, "store"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_responses.sqlite"),
+        "SEARCH_BACKEND": "stub",
+        "SEARCH_CACHE_PATH": os.path.join(workdir, "search.sqlite"),
+        "SEARCH_RATE_PER_SECOND": "1000000",
+        "SEARCH_BURST": "1000000",
+        "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "benchmark"),
+    })
+    sys.path[:0] = [SRC, os.path.join(SRC, "fastapi_app")]
+    return workdir
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[k]
+
+def summarize(seconds: list[float]) -> dict:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def peak_memory(fn) -> float:
+    """
+    Peak of the memory allocated by Python while `fn` runs, in KiB
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def reset_caches():
+    """
+    Empty the match store, the in-process caches and the match index
+    """
+    from soccer_stats.store import get_store
+    from soccer_stats.matches import player_stats_table
+    from soccer_stats.index import get_index
+    get_store().clear()
+    player_stats_table.cache_clear()
+    get_index().invalidate()
+
+def benchmark_fixture(args) -> dict:
+    from soccer_stats.competitions import load_matches
+    from soccer_stats.matches import load_match_lineups
+    matches = load_matches(args.competition_id, args.season_id)
+    first = matches.iloc[0]
+    match_id = int(first["match_id"])
+    home_team = first["home_team"]
+    player = next(p.player_name for p in load_match_lineups(match_id)[home_team] if p.is_starter)
+    return {"match_id": match_id, "match_name": f"{first['home_team']} vs {first['away_team']}",
+            "home_team": home_team, "player": player, "matches": len(matches)}
+
+def data_functions(args, fixture) -> dict:
+    from soccer_stats.matches import (get_events, get_lineups, get_player_stats, load_heatmap, load_match_lineups,
+                                      load_pass_network, load_xg_timeline)
+    from tools.soccer import filter_starting_11, pull_match_details
+    match_id = fixture["match_id"]
+    details_input = json.dumps({"match_id": match_id, "competition_id": args.competition_id, "season_id": args.season_id})
+    return {
+        "get_events": lambda: get_events(match_id),
+        "get_lineups": lambda: get_lineups(match_id),
+        "get_player_stats": lambda: get_player_stats(match_id, fixture["player"]),
+        "filter_starting_11": lambda: filter_starting_11(load_match_lineups(match_id)),
+        "pull_match_details": lambda: pull_match_details(details_input),
+        "load_heatmap": lambda: load_heatmap(match_id, fixture["home_team"]),
+        "load_pass_network": lambda: load_pass_network(match_id, fixture["home_team"]),
+        "load_xg_timeline": lambda: load_xg_timeline(match_id),
+    }
+
+def bench_data(args, fixture) -> dict:
+    """
+    Latency with empty caches (cold) and warm, and peak memory of each data function
+    """
+    results = {}
+    for name, fn in data_functions(args, fixture).items():
+        cold = []
+        for _ in range(args.cold_repeats):
+            reset_caches()
+            cold.append(timed(fn))
+        reset_caches()
+        peak_cold = peak_memory(fn)
+        warm = [timed(fn) for _ in range(args.repeats)]
+        results[name] = {"cold": summarize(cold), "warm": summarize(warm),
+                         "peak_kib_cold": peak_cold, "peak_kib_warm": peak_memory(fn)}
+    return results
+
+def api_routes(args, fixture) -> dict:
+    match_id = fixture["match_id"]
+    return {
+        "player_stats": f"/player_stats/{match_id}/{fixture['player']}",
+        "match_events_page": f"/matches/{match_id}/events?limit=500",
+        "match_summary": f"/match_summary/{match_id}",
+        "events_query": f"/events/query?match_id={match_id}&type=Shot&columns=minute&columns=player",
+    }
+
+async def load_test(client, path: str, requests: int, concurrency: int) -> dict:
+    """
+    `requests` GETs of one route from `concurrency` concurrent clients
+    """
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(path)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            url = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies), "errors": errors, "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(latencies) / elapsed, 1)}
+
+async def run_api(args, fixture) -> dict:
+    from main import app
+    from soccer_stats.client import close_client
+    import httpx
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for name, path in api_routes(args, fixture).items():
+            await client.get(path)
+            results[name] = await load_test(client, path, args.requests, args.concurrency)
+    await close_client()
+    return results
+
+def bench_api(args, fixture) -> dict:
+    """
+    Throughput and latency percentiles of the FastAPI routes under concurrency,
+    after one warm-up request per route
+    """
+    return {"concurrency": args.concurrency, "routes": asyncio.run(run_api(args, fixture))}
+
+# question of the benchmarked chat turns, a full analysis plans every tool call
+CHAT_QUESTION = "Analise a partida"
+
+def bench_agent(args, fixture) -> dict:
+    """
+    Wall time of chat turns in parallel mode (prefetch + ReAct loop), split by tool
+    """
+    from registry import registry
+    from tools import load_tools
+    from agent import load_turn_agent
+    from stubs import ToolTimings
+    timings = ToolTimings()
+    timings.install(registry, load_tools())
+    turns = []
+    for _ in range(args.turns):
+        timings.reset()
+        start = time.perf_counter()
+        agent, context = load_turn_agent(fixture["match_id"], args.competition_id, args.season_id,
+                                         fixture["match_name"], CHAT_QUESTION)
+        prefetch = time.perf_counter() - start
+        agent.invoke(input={
+            "match_id": fixture["match_id"], "match_name": fixture["match_name"], "input": CHAT_QUESTION,
+            "agent_scratchpad": "", "competition_id": args.competition_id, "season_id": args.season_id,
+            "narration_style": "Formal", "context": context,
+        })
+        turns.append({"seconds": time.perf_counter() - start, "prefetch_seconds": prefetch,
+                      "tools": dict(timings.seconds), "calls": dict(timings.calls)})
+    tool_names = sorted({name for turn in turns for name in turn["tools"]})
+    return {
+        "turn": summarize([turn["seconds"] for turn in turns]),
+        "prefetch": summarize([turn["prefetch_seconds"] for turn in turns]),
+        "tools": {name: {**summarize([turn["tools"].get(name, 0.0) for turn in turns]),
+                         "calls_per_turn": statistics.fmean(turn["calls"].get(name, 0) for turn in turns)}
+                  for name in tool_names},
+    }
+
+def bench_startup(args, fixture) -> dict:
+    """
+    Import time of each entry point in a fresh interpreter, and its slowest packages
+    """
+    from startup import profile_imports
+    return profile_imports()
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    args = parse_args()
+    setup_environment(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from registry import registry
+    from stubs import install_llm_stubs
+
+    fixture = benchmark_fixture(args)
+    install_llm_stubs(registry, fixture["match_id"], args.competition_id, args.season_id, args.llm_latency)
+    suites = {"startup": bench_startup, "data": bench_data, "api": bench_api, "agent": bench_agent}
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "fixture": fixture,
+    }
+    # the agent and the app print their progress, keep stdout for the results
+    with redirect_stdout(sys.stderr):
+        for name in args.suites.split(","):
+            results[name] = suites[name.strip()](args, fixture)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from langchain_community.llms.fake import FakeListLLM, FakeStreamingListLLM
+from langchain_core.tools import Tool
+import json
+import time
+
+# the LLM clients built by the app, by registry key
+AGENT_LLM = ("llm", "gemini-pro", 0.2)
+SPECIALIST_LLM = ("llm", "gemini-pro", None)
+SUMMARY_LLM = ("llm", "gemini-1.5-flash", None)
+
+def agent_responses(match_id: int, competition_id: int, season_id: int) -> list[str]:
+    """
+    One ReAct turn: a get_match_details call, then the final answer
+    """
+    action_input = json.dumps({"match_id": match_id, "competition_id": competition_id, "season_id": season_id})
+    return [
+        f"Thought: Preciso dos detalhes da partida.\nAction: get_match_details\nAction Input: {action_input}",
+        "Thought: Completei a análise da partida com sucesso.\nFinal Answer: Análise da partida de benchmark.",
+    ]
+
+def install_llm_stubs(registry, match_id: int, competition_id: int, season_id: int, latency: float = 0.0):
+    """
+    Replace the Gemini clients of the registry with canned responses, each
+    call (or streamed chunk) waiting `latency` seconds
+    """
+    sleep = latency or None
+    registry.set(AGENT_LLM, FakeListLLM(responses=agent_responses(match_id, competition_id, season_id), sleep=sleep))
+    registry.set(SPECIALIST_LLM, FakeListLLM(responses=["Comentário do especialista de benchmark."], sleep=sleep))
+    registry.set(SUMMARY_LLM, FakeStreamingListLLM(responses=["Resumo da partida de benchmark."], sleep=sleep))
+
+class ToolTimings:
+    """
+    Wall time spent in each tool, collected by wrapping the shared tools
+    """
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def wrap(self, tool) -> Tool:
+        def run(tool_input):
+            start = time.perf_counter()
+            try:
+                return tool.run(tool_input)
+            finally:
+                self.seconds[tool.name] = self.seconds.get(tool.name, 0.0) + time.perf_counter() - start
+                self.calls[tool.name] = self.calls.get(tool.name, 0) + 1
+        return Tool(name=tool.name, description=tool.description, func=run)
+
+    def install(self, registry, tools: list):
+        registry.set("tools", [self.wrap(tool) for tool in tools])
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
@@ -1,14 +1,55 @@
-from langchain_google_genai import GoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.agents import create_react_agent, AgentExecutor
-from langchain import hub
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import BaseTool, Tool
+from concurrent.futures import ThreadPoolExecutor
+from registry import registry, get_llm
 from tools import load_tools
+import threading
+import json
+import os
+
+FINAL_ANSWER = "Final Answer:"
+AGENT_MAX_ITERATIONS = 10
+# words of a question asking about the teams themselves, which the web searches answer
+TEAM_QUESTION_WORDS = ["time", "equipe", "clube", "seleç", "rival", "históri", "confront", "técnico", "treinador",
+                       "elenco", "títul", "análise", "analise", "analis"]
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """
+    Forwards the tokens of the agent's final answer to `on_token` as soon as
+    the LLM generates them. The Thought/Action text before "Final Answer:"
+    is not forwarded.
+    """
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self.buffer = ""
+        self.streaming = False
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.buffer = ""
+        self.streaming = False
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.streaming:
+            self.on_token(token)
+            return
+        self.buffer += token
+        if FINAL_ANSWER in self.buffer:
+            self.streaming = True
+            answer_start = self.buffer.split(FINAL_ANSWER, 1)[1].lstrip()
+            if answer_start:
+                self.on_token(answer_start)
 
 def load_agent() -> AgentExecutor:
     """
     Load the agent with tools and return the AgentExecutor object.
+    The agent is built once per process and shared across sessions.
     """
-    llm = GoogleGenerativeAI(model="gemini-pro", temperature=0.2)
+    return registry.get("agent", build_agent)
+
+def build_react_agent():
+    llm = get_llm("gemini-pro", temperature=0.2)
 
     soccer_prompt = """
     You must always work in Brazilian Portuguese, PT-BR.
@@ -51,6 +92,11 @@ def load_agent() -> AgentExecutor:
     Action Input: {{"match_id": "001", "competition_id": "122", "season_id": "01"}}
     Observation: Eu possuo todos os dados necessários? Se não, utilizarei a ferramenta para conseguí-los. Caso já tenha, posso prosseguir com a análise.
 
+    # Contexto já obtido
+    Os resultados abaixo já foram obtidos com as ferramentas nesta rodada, não utilize a ferramenta novamente para obtê-los.
+    Se eles forem suficientes para a tarefa, responda imediatamente com a Final Answer.
+    {context}
+
     # Próximas etapas
     De acordo com o retorno da ferramenta, decida o próximo passo a seguir ou mostre sua análise ao usuário.
     Se a tarefa solicitada foi concluída, demonstre sua análise ao usuário.
@@ -78,15 +124,123 @@ def load_agent() -> AgentExecutor:
                             "tool_names",
                             "tools",
                             "narration_style"],
+        partial_variables={"context": "Nenhum."},
         template=soccer_prompt
     )
-    tools = load_tools()
-    agent = create_react_agent(llm=llm, tools=tools, prompt=prompt)
+    return create_react_agent(llm=llm, tools=load_tools(), prompt=prompt)
 
+def build_agent() -> AgentExecutor:
     return AgentExecutor(
-        agent=agent,
-        tools=tools,
+        agent=registry.get("react_agent", build_react_agent),
+        tools=load_tools(),
+        handle_parsing_errors=True,
+        verbose=True,
+        max_iterations=AGENT_MAX_ITERATIONS
+    )
+
+def normalize_tool_input(tool_input) -> str:
+    """
+    Normalize a tool input so equivalent calls share a cache entry
+    (JSON key order and value types, whitespace and case of plain text)
+    """
+    if isinstance(tool_input, dict):
+        tool_input = json.dumps(tool_input)
+    try:
+        data = json.loads(tool_input)
+        if isinstance(data, dict):
+            return json.dumps({k: str(v) for k, v in data.items()}, sort_keys=True)
+    except (TypeError, ValueError):
+        pass
+    return " ".join(str(tool_input).lower().split())
+
+class TurnToolCache:
+    """
+    Tool results of one chat turn. Independent calls planned up front run
+    concurrently, and a tool called again with an equivalent input during
+    the same turn returns the stored result instead of running again.
+    """
+    def __init__(self):
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def run(self, tool: BaseTool, tool_input) -> str:
+        key = (tool.name, normalize_tool_input(tool_input))
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+        result = tool.run(tool_input)
+        if not isinstance(result, str):
+            result = str(result)
+        with self.lock:
+            self.results[key] = result
+        return result
+
+    def wrap(self, tools: list[BaseTool]) -> list[Tool]:
+        """
+        Copies of the tools reading through this cache
+        """
+        return [
+            Tool(name=t.name, description=t.description, func=lambda tool_input, t=t: self.run(t, tool_input))
+            for t in tools
+        ]
+
+    def prefetch(self, calls: list[tuple[BaseTool, str]], max_workers: int = 4) -> dict:
+        """
+        Run independent tool calls concurrently, returning tool name -> result
+        (or the error message when a call fails)
+        """
+        def call(tool, tool_input):
+            try:
+                return self.run(tool, tool_input)
+            except Exception as e:
+                return f"Erro: {e}"
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(tool, executor.submit(call, tool, tool_input)) for tool, tool_input in calls]
+            return {f"{tool.name}({tool_input})": future.result()
+                    for (tool, future), (_, tool_input) in zip(futures, calls)}
+
+def needs_team_information(question: str, teams: list[str]) -> bool:
+    """
+    Whether a question is about the teams (history, rivalry, squad...) or asks
+    for a full analysis, rather than only about what happened in the match
+    """
+    question = question.lower()
+    return any(word in question for word in TEAM_QUESTION_WORDS + [team.lower() for team in teams])
+
+def plan_tool_calls(match_id, competition_id, season_id, match_name: str, question: str) -> list[tuple[BaseTool, str]]:
+    """
+    The independent tool calls a question needs: the match details always,
+    the web search of each team only when the question is about the teams.
+    Any other call is made by the agent, through the turn cache.
+    """
+    tools = {t.name: t for t in load_tools()}
+    calls = [(tools["get_match_details"], json.dumps(
+        {"match_id": match_id, "competition_id": competition_id, "season_id": season_id}
+    ))]
+    teams = match_name.split(" vs ")
+    if needs_team_information(question, teams):
+        for team in teams:
+            calls.append((tools["search_team_information"], f"{team} futebol"))
+    return calls
+
+def load_turn_agent(match_id, competition_id, season_id, match_name: str, question: str) -> tuple[AgentExecutor, str]:
+    """
+    Agent for one chat turn in parallel mode: the tool calls planned for the
+    question run concurrently before the ReAct loop and their results go in
+    the prompt as context, so the agent can answer as soon as it has what it
+    needs instead of fetching it step by step.
+
+    Returns the agent and the context to pass as the `context` input.
+    """
+    turn_cache = TurnToolCache()
+    results = turn_cache.prefetch(plan_tool_calls(match_id, competition_id, season_id, match_name, question))
+    context = "\n".join(f"- {call}:\n{result}" for call, result in results.items())
+    agent = AgentExecutor(
+        agent=registry.get("react_agent", build_react_agent),
+        tools=turn_cache.wrap(load_tools()),
         handle_parsing_errors=True,
         verbose=True,
-        max_iterations=10
-    )
\ No newline at end of file
+        max_iterations=AGENT_MAX_ITERATIONS,
+    )
+    return agent, context
\ No newline at end of file
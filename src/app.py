@@ -1,39 +1,192 @@
-from soccer_stats.competitions import get_competitions, get_matches
-from soccer_stats.matches import get_lineups, get_player_stats
-from langchain.memory import ConversationBufferMemory
-from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from langchain.schema import AIMessage, HumanMessage
-# from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
-# from tools.soccer import get_sport_specialist_comments_about_match as comments_about_a_match
-from tools import load_tools
-from agent import load_agent
+# first import: the startup profiler times the page from here
+from startup import mark
+from soccer_stats.index import get_index
+from soccer_stats.matches import (PlayerStatsError, load_heatmap, load_match_lineups, load_pass_network,
+                                  load_player_stats, load_xg_timeline)
+from soccer_stats.spatial import PITCH_LENGTH, PITCH_WIDTH
+from metrics import metrics
 import streamlit as st
-import json
-import matplotlib.pyplot as plt
+import pandas as pd
+import io
 import os
 
-LANGCHAIN_TRACING_V2=True
-LANGCHAIN_ENDPOINT="https://api.smith.langchain.com"
-LANGCHAIN_API_KEY=os.getenv("LANGCHAIN_API_KEY")
-LANGCHAIN_PROJECT="pr-extraneous-prosecutor-7"
+mark("imports")
 
 st.set_page_config(page_title="Soccer Match Details",
                    page_icon="⚽️")
 
-msgs = StreamlitChatMessageHistory()
+# LangChain, the agent and its tools are only imported once the chat is used
+def chat_memory():
+    """
+    The conversation memory of the session, created on first use
+    """
+    if "memory" not in st.session_state:
+        from langchain.memory import ConversationBufferMemory
+        from langchain_community.chat_message_histories import StreamlitChatMessageHistory
+        st.session_state["memory"] = ConversationBufferMemory(messages=StreamlitChatMessageHistory(), memory_key="chat_history", return_messages=True)
+    return st.session_state["memory"]
 
-# Create memory for the conversation
-if "memory" not in st.session_state:
-    st.session_state["memory"] = ConversationBufferMemory(messages=msgs, memory_key="chat_history", return_messages=True)
 def memorize_message():
+    from langchain.schema import HumanMessage
     user_input = st.session_state["user_input"]
-    st.session_state["memory"].chat_memory.add_message(HumanMessage(content=user_input))
+    chat_memory().chat_memory.add_message(HumanMessage(content=user_input))
 
-# Load the competitions and agents
-def load_competitions():
-    return json.loads(get_competitions())
-def load_matches(competition_id, season_id):
-    return  json.loads(get_matches(competition_id, season_id))
+# Match data does not change once played: the dashboard reads it through
+# Streamlit's data cache and only the widgets that changed are rerun
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "3600"))
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_competition_names() -> list[str]:
+    return get_index().competition_names()
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_season_names(competition_name: str) -> list[str]:
+    return get_index().season_names(competition_name)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_season_ids(competition_name: str, season_name: str) -> tuple[int, int]:
+    return get_index().get_season_ids(competition_name, season_name)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_match_names(competition_id: int, season_id: int) -> list[str]:
+    return get_index().match_names(competition_id, season_id)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_match_details(competition_id: int, season_id: int, match_name: str) -> dict:
+    return get_index().get_match_by_name(competition_id, season_id, match_name)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_team_players(match_id: int) -> dict[str, list[str]]:
+    return {
+        team: [player.player_name for player in players]
+        for team, players in load_match_lineups(match_id).items()
+    }
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_stats(match_id: int, player_name: str) -> dict:
+    return load_player_stats(match_id, player_name).to_dict()
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def player_chart(match_id: int, player_name: str) -> bytes:
+    """
+    The bar chart of a player's stats, rendered once as a PNG
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    stats = {key.title(): value for key, value in load_stats(match_id, player_name).items() if key != "player"}
+    fig, ax = plt.subplots()
+    ax.barh(list(stats.keys()), list(stats.values()))
+    ax.set_xlabel('Quantidade')
+    ax.set_title(f'Estatísticas de {player_name}')
+    return figure_png(fig)
+
+def pitch_figure():
+    """
+    An empty figure with the outline of the pitch, in StatsBomb coordinates
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot([0, PITCH_LENGTH, PITCH_LENGTH, 0, 0], [0, 0, PITCH_WIDTH, PITCH_WIDTH, 0], color="gray", linewidth=1)
+    ax.plot([PITCH_LENGTH / 2, PITCH_LENGTH / 2], [0, PITCH_WIDTH], color="gray", linewidth=1)
+    for x in [0, PITCH_LENGTH - 18]:
+        ax.plot([x, x + 18, x + 18, x, x], [18, 18, 62, 62, 18], color="gray", linewidth=1)
+    ax.set_xlim(-2, PITCH_LENGTH + 2)
+    # StatsBomb y grows downwards
+    ax.set_ylim(PITCH_WIDTH + 2, -2)
+    ax.set_aspect("equal")
+    ax.axis("off")
+    return fig, ax
+
+def figure_png(fig) -> bytes:
+    import matplotlib.pyplot as plt
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def heatmap_chart(match_id: int, team: str, player: str | None = None) -> bytes:
+    """
+    The heatmap of a player, or of a whole team, rendered once as a PNG from the precomputed grid
+    """
+    fig, ax = pitch_figure()
+    ax.imshow(load_heatmap(match_id, team, player), extent=(0, PITCH_LENGTH, PITCH_WIDTH, 0),
+              cmap="Reds", interpolation="bilinear", alpha=0.8)
+    ax.set_title(f"Mapa de calor de {player or team}")
+    return figure_png(fig)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def pass_network_chart(match_id: int, team: str, min_passes: int) -> bytes:
+    """
+    The pass network of a team: players at their average position, lines as thick as the passes between them
+    """
+    network = load_pass_network(match_id, team, min_passes)
+    positions = network["nodes"].set_index("player")
+    edges = network["edges"][network["edges"]["player"] != network["edges"]["recipient"]]
+    fig, ax = pitch_figure()
+    most = max(edges["passes"].max(), 1) if len(edges) else 1
+    for edge in edges.itertuples():
+        if edge.player in positions.index and edge.recipient in positions.index:
+            ax.plot([positions.at[edge.player, "x"], positions.at[edge.recipient, "x"]],
+                    [positions.at[edge.player, "y"], positions.at[edge.recipient, "y"]],
+                    color="tab:blue", linewidth=4 * edge.passes / most, alpha=0.6)
+    ax.scatter(positions["x"], positions["y"], s=positions["touches"] * 3, color="tab:red", zorder=2)
+    for player, node in positions.iterrows():
+        ax.annotate(player, (node["x"], node["y"]), fontsize=6, ha="center", va="bottom")
+    ax.set_title(f"Rede de passes de {team}")
+    return figure_png(fig)
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def xg_timeline_chart(match_id: int) -> pd.DataFrame:
+    """
+    Running xG of each team by match minute, one column per team
+    """
+    shots = load_xg_timeline(match_id)
+    if shots.empty:
+        return pd.DataFrame()
+    shots = shots.assign(minute=shots["minute"] + shots["second"] / 60)
+    timeline = shots.pivot_table(index="minute", columns="team", values="cumulative_xg", aggfunc="max")
+    start = pd.DataFrame(0.0, index=pd.Index([0.0], name="minute"), columns=timeline.columns)
+    return pd.concat([start, timeline]).ffill()
+
+@st.fragment
+def spatial_section(match_id: int, home_team: str, away_team: str):
+    """
+    Heatmaps, pass networks and the xG timeline of a match; changing the team reruns only this section
+    """
+    with st.container(border=True):
+        st.subheader("Mapas e xG")
+        team = st.radio("Time", [home_team, away_team], horizontal=True, key="spatial_team")
+        min_passes = st.slider("Mínimo de passes entre dois jogadores", 1, 10, 3, key="min_passes")
+        c1, c2 = st.columns(2)
+        with c1:
+            st.image(heatmap_chart(match_id, team))
+        with c2:
+            st.image(pass_network_chart(match_id, team, min_passes))
+        st.write("xG acumulado")
+        st.line_chart(xg_timeline_chart(match_id))
+
+@st.fragment
+def player_column(match_id: int, team: str, label: str, key: str):
+    """
+    Player picker and stats of one team; changing the player reruns only this column
+    """
+    with st.container(border=True):
+        st.write(f"{label}: {team}")
+        player = st.selectbox("Escolha um jogador", load_team_players(match_id)[team], key=key)
+        try:
+            load_stats(match_id, player)
+        except PlayerStatsError as e:
+            st.info(e.message)
+            return
+        with st.container(border=True):
+            for stat, value in load_stats(match_id, player).items():
+                st.write(f"{stat.title()}: {value}")
+        st.image(player_chart(match_id, player))
+        st.image(heatmap_chart(match_id, team, player))
 
 # Create a sidebar to select Competition, Season and Match
 st.sidebar.title("Apita o árbitro!")
@@ -45,33 +198,31 @@ match_details = None
 specialist_comments = None
 
 st.sidebar.header("Selecione uma competição, temporada e jogo")
-competitions = load_competitions()
-competition_names = sorted(set([comp['competition_name'] for comp in competitions]))
+competition_names = load_competition_names()
 selected_competition = st.sidebar.selectbox("Choose Competition", competition_names)
 
 if selected_competition:
-    seasons = set(comp['season_name'] for comp in competitions if comp['competition_name'] == selected_competition)
-    selected_season = st.sidebar.selectbox("Choose Season", sorted(seasons))
+    seasons = load_season_names(selected_competition)
+    selected_season = st.sidebar.selectbox("Choose Season", seasons)
 
 if selected_season:
-    competition_id = next((comp['competition_id'] for comp in competitions if comp['competition_name'] == selected_competition),
-        None
-    )
-    season_id = next((comp['season_id'] for comp in competitions if comp['season_name'] == selected_season and comp['competition_name'] == selected_competition),
-        None
-    )
+    competition_id, season_id = load_season_ids(selected_competition, selected_season)
 
-    matches = load_matches(competition_id, season_id)
-    match_names = sorted([f"{match['home_team']} vs {match['away_team']}" for match in matches])
+    match_names = load_match_names(competition_id, season_id)
 
     if selected_match:=st.sidebar.selectbox("Choose Match", match_names):
-        match_details = next((match for match in matches if f"{match['home_team']} vs {match['away_team']}" == selected_match),
-            None
-        ) 
+        match_details = load_match_details(competition_id, season_id, selected_match)
         match_id = match_details['match_id']
 
 narration_style = st.sidebar.radio("Escolha o estilo de narração para nosso comentarista especialista", ["Formal", "Humorístico", "Técnico"])
 
+if st.sidebar.checkbox("Painel de depuração", key="debug_panel"):
+    with st.sidebar.expander("Métricas", expanded=True):
+        snapshot = metrics.snapshot()
+        st.dataframe([{"name": t["name"], **t["labels"], "count": t["count"], "p50_ms": t["p50_ms"],
+                       "p99_ms": t["p99_ms"], "total_s": t["total_seconds"]} for t in snapshot["timings"]])
+        st.dataframe([{"name": c["name"], **c["labels"], "value": c["value"]} for c in snapshot["counters"]])
+
 t1, t2 = st.tabs(["Início", "Chat"])
 
 with t1:
@@ -82,67 +233,13 @@ with t1:
             st.write("Detalhes do jogo:")
             for key, value in match_details.items():
                 st.write(f"{key}: {value}")
-    home_team = match_details['home_team']
-    away_team = match_details['away_team']
-    lineups_str = get_lineups(match_id)
-    lineups_dict = json.loads(lineups_str)
-    ht_len = len(lineups_dict[home_team])
-    at_len = len(lineups_dict[away_team])
-    ht_players = [lineups_dict[home_team][i]['player_name'] for i in range(ht_len)]
-    at_players = [lineups_dict[away_team][i]['player_name'] for i in range(at_len)]
-    c1, c2 = st.columns(2)
-    with c1:
-        with st.container(border=True):
-            st.write(f"Time da casa: {home_team}")
-            home_player = st.selectbox("Escolha um jogador", ht_players)
-            player_stats_str = get_player_stats(match_id, home_player)
-            player_stats_dict = json.loads(player_stats_str)
-            with st.container(border=True):
-                for key, value in player_stats_dict.items():
-                    st.write(f"{key.title()}: {value}")
-            stats = {
-                "Passes_Completed": player_stats_dict.get("passes_completed", 0),
-                "Passes_Attempted": player_stats_dict.get("passes_attempted", 0),
-                "Shots": player_stats_dict.get("shots", 0),
-                "Shots_On_Target": player_stats_dict.get("shots_on_target", 0),
-                "Fouls_Committed": player_stats_dict.get("fouls_committed", 0),
-                "Fouls_Won": player_stats_dict.get("fouls_won", 0),
-                "Tackles": player_stats_dict.get("tackles", 0),
-                "Interceptions": player_stats_dict.get("interceptions", 0),
-                "Dribbles_Successful": player_stats_dict.get("dribbles_successful", 0),
-                "Dribbles_Attempted": player_stats_dict.get("dribbles_attempted", 0)
-            }
-            fig, ax = plt.subplots()
-            ax.barh(list(stats.keys()), list(stats.values()))
-            ax.set_xlabel('Quantidade')
-            ax.set_title(f'Estatísticas de {home_player}')
-            st.pyplot(fig)
-    with c2:
-        with st.container(border=True):
-            st.write(f"Time visitante: {away_team}")
-            away_player = st.selectbox("Escolha um jogador", at_players)
-            player_stats_str = get_player_stats(match_id, away_player)
-            player_stats_dict = json.loads(player_stats_str)
-            with st.container(border=True):
-                for key, value in player_stats_dict.items():
-                    st.write(f"{key.title()}: {value}")
-            stats = {
-                "Passes_Completed": player_stats_dict.get("passes_completed", 0),
-                "Passes_Attempted": player_stats_dict.get("passes_attempted", 0),
-                "Shots": player_stats_dict.get("shots", 0),
-                "Shots_On_Target": player_stats_dict.get("shots_on_target", 0),
-                "Fouls_Committed": player_stats_dict.get("fouls_committed", 0),
-                "Fouls_Won": player_stats_dict.get("fouls_won", 0),
-                "Tackles": player_stats_dict.get("tackles", 0),
-                "Interceptions": player_stats_dict.get("interceptions", 0),
-                "Dribbles_Successful": player_stats_dict.get("dribbles_successful", 0),
-                "Dribbles_Attempted": player_stats_dict.get("dribbles_attempted", 0)
-            }
-            fig, ax = plt.subplots()
-            ax.barh(list(stats.keys()), list(stats.values()))
-            ax.set_xlabel('Quantidade')
-            ax.set_title(f'Estatísticas de {home_player}') 
-            st.pyplot(fig)
+    if match_details:
+        c1, c2 = st.columns(2)
+        with c1:
+            player_column(match_id, match_details['home_team'], "Time da casa", "home_player")
+        with c2:
+            player_column(match_id, match_details['away_team'], "Time visitante", "away_player")
+        spatial_section(match_id, match_details['home_team'], match_details['away_team'])
 with t2:
     if not match_id:
         st.title("Football Match Conversation")
@@ -153,7 +250,11 @@ with t2:
             st.chat_input(key="user_input", on_submit=memorize_message) 
 
             if user_input := st.session_state.user_input:
-                chat_history = st.session_state["memory"].chat_memory.messages
+                from langchain.schema import AIMessage, HumanMessage
+                from langchain_community.callbacks.streamlit import StreamlitCallbackHandler
+                from tools import load_tools
+                from agent import load_turn_agent, FinalAnswerStreamHandler
+                chat_history = chat_memory().chat_memory.messages
 
                 for msg in chat_history:
                     if isinstance(msg, HumanMessage):
@@ -163,10 +264,18 @@ with t2:
                         with st.chat_message("assistant"):
                             st.write(f"{msg.content}")
                             
-                with st.spinner("Estou pensando..."):
+                with st.chat_message("assistant"):
+                    steps_container = st.container()
+                    answer_placeholder = st.empty()
+                    streamed_tokens = []
+
+                    def show_token(token):
+                        streamed_tokens.append(token)
+                        answer_placeholder.markdown("".join(streamed_tokens) + "▌")
+
                     try:
-                        agent = load_agent()
-                        
+                        agent, context = load_turn_agent(match_id, competition_id, season_id, selected_match, user_input)
+
                         tools = load_tools()
                         tool_names = [tool.name for tool in tools]
                         tool_descriptions = [tool.description for tool in tools]
@@ -180,21 +289,26 @@ with t2:
                             "season_id": season_id,
                             "tool_names": tool_names,
                             "tools": tool_descriptions,
-                            "narration_style": narration_style
+                            "narration_style": narration_style,
+                            "context": context
                         }
 
-                        response = agent.invoke(input=input_data, handle_parsing_errors=True)
+                        callbacks = [
+                            StreamlitCallbackHandler(steps_container, expand_new_thoughts=False),
+                            FinalAnswerStreamHandler(show_token),
+                        ]
+                        response = agent.invoke(input=input_data, config={"callbacks": callbacks})
 
                         if isinstance(response, dict) and "output" in response:
                             output = response.get("output")
                         else:
                             output = "Desculpe, não entendi. Tente novamente."
 
-                        st.session_state["memory"].chat_memory.add_message(AIMessage(content=output))
+                        chat_memory().chat_memory.add_message(AIMessage(content=output))
 
-                        with st.chat_message("assistant"):
-                            st.write(output)
+                        answer_placeholder.markdown(output)
 
                     except Exception as e:
                         st.error(f"Erro na execução do agente: {str(e)}")
 
+mark("first_paint")
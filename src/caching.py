@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+import os
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "soccer_stats", "llm_responses.sqlite"))
+MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "256"))
+
+def content_key(*parts) -> str:
+    """
+    Hash of the given parts (prompt template, model, inputs...), used as a cache key
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier content-addressed cache: an in-memory LRU in front of a SQLite file.
+
+    Entries can carry a tag (e.g. "match:3788741") so every entry about the
+    same object can be invalidated at once. `ttl` (seconds) is optional, by
+    default entries never expire.
+    """
+    def __init__(self, path: str = CACHE_PATH, memory_size: int = MEMORY_SIZE, ttl: float | None = None):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, tag TEXT, value TEXT, created_at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)")
+        self.db.commit()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self.memory[key] = (value, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            if key in self.memory:
+                value, created_at = self.memory[key]
+                if not self._expired(created_at):
+                    self.memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    return value
+                del self.memory[key]
+            row = self.db.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1]):
+                self.metrics["misses"] += 1
+                return None
+            self._remember(key, *row)
+            self.metrics["disk_hits"] += 1
+            return row[0]
+
+    def set(self, key: str, value: str, tag: str | None = None):
+        created_at = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, tag, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, tag, value, created_at),
+            )
+            self.db.commit()
+            self._remember(key, value, created_at)
+            self.metrics["writes"] += 1
+
+    def invalidate(self, key: str | None = None, tag: str | None = None) -> int:
+        """
+        Remove one entry by key, every entry with a tag, or everything when neither is given
+        """
+        with self.lock:
+            if key is not None:
+                cursor = self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.memory.pop(key, None)
+            elif tag is not None:
+                keys = [row[0] for row in self.db.execute("SELECT key FROM entries WHERE tag = ?", (tag,))]
+                cursor = self.db.execute("DELETE FROM entries WHERE tag = ?", (tag,))
+                for k in keys:
+                    self.memory.pop(k, None)
+            else:
+                cursor = self.db.execute("DELETE FROM entries")
+                self.memory.clear()
+            self.db.commit()
+            return cursor.rowcount
+
+    def get_or_compute(self, key: str, compute, tag: str | None = None) -> str:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, tag)
+        return value
+
+    async def aget_or_compute(self, key: str, compute, tag: str | None = None) -> str:
+        """
+        Same as `get_or_compute`, for a coroutine function `compute`
+        """
+        value = self.get(key)
+        if value is None:
+            value = await compute()
+            self.set(key, value, tag)
+        return value
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.metrics["memory_hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+            hits = lookups - self.metrics["misses"]
+            return {**self.metrics, "hit_rate": hits / lookups if lookups else 0.0,
+                    "memory_entries": len(self.memory)}
+
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process wide LLM response cache
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+def close_response_cache():
+    global _response_cache
+    if _response_cache is not None:
+        _response_cache.close()
+        _response_cache = None
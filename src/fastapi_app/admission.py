@@ -0,0 +1,89 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import metrics
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+
+class AdmissionController:
+    """
+    Bounds the LLM calls of one worker: at most `limit` run at the same time,
+    at most `max_queue` requests wait for a slot, and none waits longer than
+    `queue_timeout` seconds. A request over the queue is rejected with 429, a
+    request that waited too long with 503, both with a Retry-After header.
+    """
+    def __init__(self, limit: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a slot is likely free: the p50 LLM call time for every
+        round of `limit` calls ahead in the queue
+        """
+        llm_seconds = [t["p50_ms"] / 1000 for t in metrics.snapshot()["timings"] if t["name"] == "llm" and t["count"]]
+        per_call = max(llm_seconds) if llm_seconds else 1.0
+        return max(1, math.ceil(per_call * (self.waiting // self.limit + 1)))
+
+    def reject(self, status_code: int, detail: str):
+        metrics.increment("admission_rejected", status=status_code)
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(self.retry_after())})
+
+    async def acquire(self):
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            self.reject(429, "Too many summary requests waiting, try again later")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.reject(503, "No LLM capacity available, try again later")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "max_queue": self.max_queue}
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    A streaming response holding an admission slot taken before it was
+    returned (so an overload is still a 429/503). The slot is released once
+    the response is over: body sent, client gone before the body started,
+    or sending failed, none of which the body generator alone would see.
+    """
+    def __init__(self, content, controller: AdmissionController, **kwargs):
+        super().__init__(content, **kwargs)
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.controller.release()
+
+llm_admission = AdmissionController()
@@ -1,9 +1,64 @@
-from fastapi import FastAPI
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# first import: the startup profiler times the worker from here
+from startup import mark
+from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
 from routers.items import router
+from routers.events import router as events_router
+from routers.jobs import router as jobs_router, get_job_runner
+from routers.live import router as live_router
+from routers.spatial import router as spatial_router
+from soccer_stats.client import close_client, get_client
+from soccer_stats.store import get_store
+from soccer_stats.season import close_season_pool, get_season_pool
+from caching import close_response_cache, get_response_cache
+from jobs import close_job_queue
+from registry import registry
+from metrics import metrics
+import time
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the shared resources of the worker on startup (match store, response
+    cache, StatsBomb client, season pool, job runner) and release them on shutdown
+    """
+    app.state.store = get_store()
+    app.state.season_pool = get_season_pool()
+    app.state.response_cache = get_response_cache()
+    app.state.client = get_client()
+    app.state.job_runner = get_job_runner()
+    app.state.job_runner.start()
+    mark("ready")
+    yield
+    await app.state.job_runner.stop()
+    close_job_queue()
+    close_season_pool()
+    await close_client()
+    close_response_cache()
+    registry.refresh()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """
+    Record the latency of every request, by route template and status code
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe("http_request", time.perf_counter() - start, error=response.status_code >= 500,
+                    method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
 
 app.include_router(router)
+app.include_router(events_router)
+app.include_router(jobs_router)
+app.include_router(live_router)
+app.include_router(spatial_router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response, StreamingResponse
+import pyarrow as pa
+import asyncio
+import json
+import zlib
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from soccer_stats.client import get_client
+from soccer_stats.query import EventFilter, query_events, frame_records
+from soccer_stats.store import get_store
+from caching import content_key
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+MAX_PAGE_SIZE = 5000
+CHUNK_SIZE = 64 * 1024
+
+def pick_encoding(accept_encoding: str) -> str | None:
+    """
+    The compression to use for a response, from the Accept-Encoding header: zstd
+    when the zstandard package is installed and the client accepts it, then gzip
+    """
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if "zstd" in accepted and zstandard is not None:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compressor(encoding: str):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+def compressed(chunks, encoding: str | None):
+    """
+    Compress a stream of byte chunks on the fly
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    stream = compressor(encoding)
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.flush()
+
+def json_chunks(records: list[dict], next_cursor: int | None):
+    body = json.dumps({"events": records, "next_cursor": next_cursor}).encode("utf-8")
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+def ndjson_chunks(records: list[dict]):
+    for record in records:
+        yield json.dumps(record).encode("utf-8") + b"\n"
+
+def arrow_chunks(events):
+    """
+    The page as an Arrow IPC stream, nested columns are kept as JSON strings
+    """
+    table = pa.Table.from_pandas(events, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body = sink.getvalue()
+    for start in range(0, body.size, CHUNK_SIZE):
+        yield body.slice(start, min(CHUNK_SIZE, body.size - start)).to_pybytes()
+
+def events_etag(version: tuple, match_id: int, **params) -> str:
+    """
+    Validator of an events page: the version of the stored file, which changes
+    whenever the events are rewritten (a live match finishing, a prefetch with
+    --force), and the query parameters identify the response
+    """
+    return f'W/"{content_key(match_id, version, params)[:32]}"'
+
+@router.get("/matches/{match_id}/events")
+async def match_events(request: Request, match_id: int, cursor: int | None = None,
+                       limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE), fields: list[str] = Query(None),
+                       type: list[str] = Query(None), player: list[str] = Query(None),
+                       period: list[int] = Query(None), format: str = Query("json", pattern="^(json|ndjson|arrow)$")):
+    """
+    One page of the events of a match, in event order
+
+    `cursor` is the `next_cursor` of the previous page (also sent in the
+    X-Next-Cursor header), `fields` selects the columns. Responses are
+    compressed with zstd or gzip following Accept-Encoding and carry an ETag
+    for conditional requests.
+    """
+    version = get_store().version("events", match_id)
+    if version is None:
+        await get_client().events(match_id)
+        version = get_store().version("events", match_id)
+
+    params = {"cursor": cursor, "limit": limit, "fields": fields, "type": type,
+              "player": player, "period": period, "format": format}
+    headers = {"Vary": "Accept-Encoding"}
+    # no validator when the file was evicted again in the meantime, the page is then read from what is left
+    if version is not None:
+        etag = events_etag(version, match_id, **params)
+        headers.update({"ETag": etag, "Cache-Control": "private, max-age=3600"})
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+    columns = None if fields is None else list(dict.fromkeys(["index", *fields]))
+    event_filter = EventFilter.from_params(match_ids=[match_id], types=type, players=player,
+                                           periods=period, after_index=cursor)
+    # the page is selected by index, files written before events were stored in index order are grouped by type
+    events = await asyncio.to_thread(query_events, event_filter, columns, decode=format != "arrow")
+    events = events.sort_values("index", kind="stable").head(limit).reset_index(drop=True)
+    next_cursor = int(events["index"].max()) if len(events) == limit else None
+    if fields is not None and "index" not in fields:
+        events = events.drop(columns="index")
+
+    if format == "arrow":
+        chunks = arrow_chunks(events)
+    elif format == "ndjson":
+        chunks = ndjson_chunks(frame_records(events))
+    else:
+        chunks = json_chunks(frame_records(events), next_cursor)
+
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return StreamingResponse(compressed(chunks, encoding), media_type=MEDIA_TYPES[format], headers=headers)
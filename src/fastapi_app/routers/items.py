@@ -1,22 +1,27 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 router = APIRouter()
 
-from langchain.chains import LLMChain
-from langchain_google_genai import GoogleGenerativeAI
-from langchain.prompts import PromptTemplate
-import yaml
+import asyncio
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from soccer_stats.matches import get_events, get_player_stats
+from soccer_stats.matches import load_player_stats
+from soccer_stats.digest import MATCH_SUMMARY_TOKEN_BUDGET, build_match_digest, build_period_digests
+from soccer_stats.client import get_client
+from soccer_stats.season import load_season_players, load_season_teams, table_records
+from soccer_stats.query import EventFilter, query_events, frame_records
+from soccer_stats.competitions import load_matches
+from caching import content_key, get_response_cache
+from registry import registry, get_llm
+from metrics import metrics
+from admission import SlotStreamingResponse, llm_admission
 
-def events_summary(match_events):
-    """
-    Uses an LLM to summarize the events of a match
-    """
-    pre_prompt = """
+SUMMARY_MODEL = "gemini-1.5-flash"
+
+MATCH_SUMMARY_PROMPT = """
     You are an AI assistant tasked with summarizing the events of a soccer match.
     You must always make the summary as clear and friendly as possible.
     Be clear and concise in your summary.
@@ -27,28 +32,192 @@ def events_summary(match_events):
     Answer example:
     "Team A won agains Team B, with a score of 2-1. The goals were from Player A and Player B."
     """
-    llm = GoogleGenerativeAI(model="gemini-1.5-flash")
-    input_variables={"match_events": yaml.dump(match_events)}
-    prompt = PromptTemplate.from_template(pre_prompt)
-    chain = LLMChain(llm=llm, prompt=prompt, verbose=True)
-    return chain.run(**input_variables)
+
+PERIOD_SUMMARY_PROMPT = """
+    You are an AI assistant tasked with summarizing one period of a soccer match.
+    Be clear and concise, keep every goal, card and substitution with its minute.
+
+    Period {period} digest:
+    {match_events}
+    """
+
+def summary_chain(template: str):
+    # LangChain is slow to import, only load it when a summary is generated
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate.from_template(template) | get_llm(SUMMARY_MODEL)
+
+async def cached_completion(template: str, input_variables: dict, tag: str | None = None) -> str:
+    """
+    Run a prompt through the summary model, reusing the cached response for the same inputs
+    """
+    cache = get_response_cache()
+    key = content_key(template, SUMMARY_MODEL, input_variables)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    chain = summary_chain(template)
+    async with llm_admission.slot():
+        return await cache.aget_or_compute(key, lambda: chain.ainvoke(input_variables), tag)
+
+async def events_summary(match_events: str, tag: str | None = None):
+    """
+    Uses an LLM to summarize the events of a match
+    """
+    return await cached_completion(MATCH_SUMMARY_PROMPT, {"match_events": match_events}, tag)
+
+async def stream_completion(template: str, input_variables: dict, tag: str | None = None):
+    """
+    Stream the tokens of a prompt run through the summary model. A cached
+    response is sent as a single chunk, a new one is cached once complete.
+    """
+    cache = get_response_cache()
+    key = content_key(template, SUMMARY_MODEL, input_variables)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    chain = summary_chain(template)
+    chunks = []
+    async for chunk in chain.astream(input_variables):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, "".join(chunks), tag)
+
+async def summarize_periods(period_digests: dict[int, str], tag: str | None = None) -> str:
+    """
+    Map step of the chunked summary: each period digest is summarized on its own
+    """
+    period_summaries = await asyncio.gather(*[
+        cached_completion(PERIOD_SUMMARY_PROMPT, {"period": period, "match_events": digest}, tag)
+        for period, digest in period_digests.items()
+    ])
+    return "\n\n".join(
+        f"Period {period}: {summary}" for period, summary in zip(period_digests, period_summaries)
+    )
+
+async def summary_input(match_id: int, token_budget: int, chunked: bool) -> str:
+    """
+    The match events given to the summary prompt: the match digest, or the
+    period summaries in chunked (map-reduce) mode
+    """
+    events = await get_client().events(match_id)
+    if chunked:
+        period_digests = await asyncio.to_thread(build_period_digests, events, token_budget)
+        return await summarize_periods(period_digests, tag=f"match:{match_id}")
+    return await asyncio.to_thread(build_match_digest, events, token_budget)
+
+def sse(event: str, data: str) -> str:
+    """
+    Format one server-sent event
+    """
+    lines = "\n".join(f"data: {line}" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n\n"
 
 @router.get("/match_summary/{match_id}")
-def match_summary(match_id: int):
-    match_events = get_events(match_id)
-    return events_summary(match_events)
+async def match_summary(match_id: int, token_budget: int = MATCH_SUMMARY_TOKEN_BUDGET, chunked: bool = False):
+    match_events = await summary_input(match_id, token_budget, chunked)
+    return await events_summary(match_events, tag=f"match:{match_id}")
+
+@router.get("/match_summary/{match_id}/stream")
+async def match_summary_stream(match_id: int, token_budget: int = MATCH_SUMMARY_TOKEN_BUDGET, chunked: bool = False):
+    """
+    Same summary as /match_summary, streamed as server-sent events: one
+    "token" event per chunk of text and a final "done" event
+    """
+    match_events = await summary_input(match_id, token_budget, chunked)
+    input_variables = {"match_events": match_events}
+    # take the LLM slot before the response starts, so an overload is still a 429/503
+    needs_llm = get_response_cache().get(content_key(MATCH_SUMMARY_PROMPT, SUMMARY_MODEL, input_variables)) is None
+    if needs_llm:
+        await llm_admission.acquire()
+
+    async def event_stream():
+        async for token in stream_completion(MATCH_SUMMARY_PROMPT, input_variables, tag=f"match:{match_id}"):
+            yield sse("token", token)
+        yield sse("done", "")
+
+    if needs_llm:
+        return SlotStreamingResponse(event_stream(), llm_admission, media_type="text/event-stream")
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.delete("/match_summary/{match_id}/cache")
+def invalidate_match_summary(match_id: int):
+    """
+    Drop the cached LLM responses (summaries and specialist comments) of a match
+    """
+    return {"invalidated": get_response_cache().invalidate(tag=f"match:{match_id}")}
+
+@router.get("/health")
+def health():
+    return {**registry.health(), "pid": os.getpid(), "llm_admission": llm_admission.stats()}
+
+@router.post("/health/refresh")
+def refresh_clients():
+    """
+    Drop the shared LLM clients, tools and agents, they are rebuilt on next use
+    """
+    registry.refresh()
+    return health()
+
+@router.get("/cache/stats")
+def cache_stats():
+    return get_response_cache().stats()
+
+@router.get("/metrics")
+def get_metrics(format: str = "prometheus"):
+    """
+    Timings of the StatsBomb calls, serialization steps, LLM calls (and their
+    tokens), tool calls and requests, in the Prometheus text format or as JSON.
+    The metrics are those of the worker process answering, labelled with its
+    pid ("worker"): with several workers, a scrape shows one of them.
+    """
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.prometheus())
 
 @router.get("/player_stats/{match_id}/{player_name}")
-def player_stats(match_id: int, player_name: str):
-    return get_player_stats(match_id, player_name)
+async def player_stats(match_id: int, player_name: str):
+    await asyncio.gather(get_client().events(match_id), get_client().lineups(match_id))
+    stats = await asyncio.to_thread(load_player_stats, match_id, player_name)
+    return stats.to_dict()
 
-# def match_summary2(match_id: int):
-#     match_events = get_events(match_id)
-#     return events_summary(match_events)
+@router.get("/seasons/{competition_id}/{season_id}/players")
+async def season_players(competition_id: int, season_id: int, min_minutes: float = 0,
+                         sort_by: str = "minutes", limit: int | None = None):
+    """
+    Season totals and per 90 minutes rates of every player of a season
+    """
+    table = await asyncio.to_thread(load_season_players, competition_id, season_id, min_minutes)
+    if sort_by in table:
+        table = table.sort_values(sort_by, ascending=False)
+    return table_records(table.head(limit) if limit else table)
 
-# print(match_summary2(3942819))
+@router.get("/seasons/{competition_id}/{season_id}/players/{player_name}")
+async def season_player(competition_id: int, season_id: int, player_name: str):
+    table = await asyncio.to_thread(load_season_players, competition_id, season_id)
+    if table.empty or player_name not in table.index.get_level_values("player"):
+        raise HTTPException(status_code=404, detail=f"No matches found for player {player_name}")
+    return table_records(table.xs(player_name, level="player", drop_level=False))
 
-def player_stats(match_id: int, player_name: str):
-    return get_player_stats(match_id, player_name)
+@router.get("/seasons/{competition_id}/{season_id}/teams")
+async def season_teams(competition_id: int, season_id: int):
+    """
+    Season totals and per match averages of every team of a season
+    """
+    return table_records(await asyncio.to_thread(load_season_teams, competition_id, season_id))
 
-print(player_stats(303299, "Filip Kostić"))
\ No newline at end of file
+@router.get("/events/query")
+async def events_query(match_id: list[int] = Query(None), competition_id: int | None = None, season_id: int | None = None,
+                       type: list[str] = Query(None), player: list[str] = Query(None), team: list[str] = Query(None),
+                       period: list[int] = Query(None), minute_min: int | None = None, minute_max: int | None = None,
+                       columns: list[str] = Query(None), limit: int | None = 1000):
+    """
+    Query the locally stored events (see /prefetch), reading only the requested
+    columns and the parts of the files that can match the filters
+    """
+    if match_id is None and competition_id is not None and season_id is not None:
+        match_id = (await asyncio.to_thread(load_matches, competition_id, season_id))["match_id"].tolist()
+    event_filter = EventFilter.from_params(match_ids=match_id, types=type, players=player, teams=team,
+                                           periods=period, minute_min=minute_min, minute_max=minute_max)
+    events = await asyncio.to_thread(query_events, event_filter, columns, limit)
+    return frame_records(events)
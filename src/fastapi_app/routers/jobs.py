@@ -0,0 +1,141 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from soccer_stats.digest import MATCH_SUMMARY_TOKEN_BUDGET
+from soccer_stats.prefetch import prefetch_season
+from jobs import FINISHED, JOB_POLL_INTERVAL, JobRunner, RetryJob, get_job_queue
+from routers.items import events_summary, sse, summary_input
+
+router = APIRouter()
+
+# longest a client can block on GET /jobs/{job_id}?wait=
+MAX_WAIT = 30.0
+
+async def run_match_summary(match_id: int, token_budget: int, chunked: bool) -> str:
+    match_events = await summary_input(match_id, token_budget, chunked)
+    try:
+        return await events_summary(match_events, tag=f"match:{match_id}")
+    except HTTPException as e:
+        # the direct requests took every LLM slot, wait for one instead of failing the job
+        if e.status_code in (429, 503):
+            raise RetryJob(float(e.headers["Retry-After"]))
+        raise
+
+async def run_specialist_comments(competition_id: int, season_id: int, match_id: int, narration_style: str) -> str:
+    from tools.soccer import get_specialist_comments
+    action_input = json.dumps({"competition_id": competition_id, "season_id": season_id,
+                               "match_id": match_id, "narration_style": narration_style})
+    return await asyncio.to_thread(get_specialist_comments.invoke, action_input)
+
+async def run_prefetch_season(competition_id: int, season_id: int) -> str:
+    summary = await asyncio.to_thread(prefetch_season, competition_id, season_id, progress=lambda line: None)
+    return json.dumps(summary)
+
+JOB_HANDLERS = {
+    "match_summary": run_match_summary,
+    "specialist_comments": run_specialist_comments,
+    "prefetch_season": run_prefetch_season,
+}
+
+def get_job_runner() -> JobRunner:
+    return JobRunner(get_job_queue(), JOB_HANDLERS)
+
+async def job_or_404(job_id: str) -> dict:
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.post("/jobs/match_summary/{match_id}", status_code=202)
+async def submit_match_summary(match_id: int, token_budget: int = MATCH_SUMMARY_TOKEN_BUDGET, chunked: bool = False):
+    """
+    Queue the /match_summary generation, the summary is the result of the returned job
+    """
+    return await asyncio.to_thread(get_job_queue().submit, "match_summary", {"match_id": match_id, "token_budget": token_budget, "chunked": chunked})
+
+@router.post("/jobs/specialist_comments/{competition_id}/{season_id}/{match_id}", status_code=202)
+async def submit_specialist_comments(competition_id: int, season_id: int, match_id: int, narration_style: str = "Formal"):
+    """
+    Queue the specialist comments of a match, in one of the narration styles of the agent
+    """
+    return await asyncio.to_thread(get_job_queue().submit, "specialist_comments", {
+        "competition_id": competition_id, "season_id": season_id, "match_id": match_id, "narration_style": narration_style})
+
+@router.post("/prefetch/{competition_id}/{season_id}", status_code=202)
+async def start_prefetch(competition_id: int, season_id: int):
+    """
+    Queue the prefetch of a season into the match store, the summary of the
+    run (matches, events, failures) is the JSON result of the returned job
+    """
+    return await asyncio.to_thread(get_job_queue().submit, "prefetch_season",
+                                   {"competition_id": competition_id, "season_id": season_id})
+
+@router.get("/prefetch/{competition_id}/{season_id}")
+async def prefetch_status(competition_id: int, season_id: int):
+    """
+    The last prefetch job of a season, from any worker
+    """
+    job = await asyncio.to_thread(get_job_queue().latest, "prefetch_season",
+                                  {"competition_id": competition_id, "season_id": season_id})
+    return job or {"status": "not started"}
+
+@router.get("/jobs")
+def jobs_stats():
+    """
+    Number of jobs by status
+    """
+    return get_job_queue().stats()
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0):
+    """
+    A job with its result once done. With `wait` (seconds), the request
+    blocks until the job finishes or the time runs out.
+    """
+    job = await job_or_404(job_id)
+    if wait > 0 and job["status"] not in FINISHED:
+        job = await get_job_queue().wait(job_id, min(wait, MAX_WAIT))
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Follow a job as server-sent events: a "status" event on every status
+    change, then a "result" or "error" event when it finishes
+    """
+    job = await job_or_404(job_id)
+
+    async def event_stream():
+        status = None
+        current = job
+        while True:
+            if current["status"] != status:
+                status = current["status"]
+                yield sse("status", status)
+            if status == "done":
+                yield sse("result", current["result"])
+                return
+            if status in FINISHED:
+                yield sse("error", current["error"] or status)
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            current = await asyncio.to_thread(get_job_queue().get, job_id)
+            if current is None:
+                return
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a job that has not started yet
+    """
+    await job_or_404(job_id)
+    if not await asyncio.to_thread(get_job_queue().cancel, job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already started")
+    return await job_or_404(job_id)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Query
+import asyncio
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from soccer_stats.live import get_live_match
+from soccer_stats.query import frame_records
+
+router = APIRouter()
+
+@router.get("/live/{match_id}/events")
+async def live_events(match_id: int, after_index: int = 0, since: float | None = None,
+                      fields: list[str] = Query(None)):
+    """
+    Events of a live match ingested after an event index (`after_index`, the
+    "last_index" of the previous response) or after a time (`since`, seconds
+    since the epoch), with the updated stats of the players in those events
+    and the team totals. New lines of the match feed are ingested first.
+    """
+    live_match = get_live_match(match_id)
+    await asyncio.to_thread(live_match.poll)
+    delta = await asyncio.to_thread(live_match.delta, after_index, since)
+    events = delta["events"]
+    if fields:
+        events = events[[field for field in ["index", *fields] if field in events]]
+    return {
+        **delta,
+        "events": frame_records(events),
+        "player_stats": frame_records(delta["player_stats"]),
+        "team_totals": frame_records(delta["team_totals"]),
+    }
+
+@router.get("/live/{match_id}/stats")
+async def live_stats(match_id: int):
+    """
+    Player stats and team totals of a live match so far
+    """
+    live_match = get_live_match(match_id)
+    await asyncio.to_thread(live_match.poll)
+    totals = live_match.totals()
+    return {**totals, "player_stats": frame_records(totals["player_stats"]),
+            "team_totals": frame_records(totals["team_totals"])}
+
+@router.post("/live/{match_id}/finish")
+async def finish_live_match(match_id: int):
+    """
+    Store a live match as a finished one, for the other routes and the dashboard
+    """
+    return {"match_id": match_id, "events": await asyncio.to_thread(get_live_match(match_id).finish)}
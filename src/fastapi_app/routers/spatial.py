@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from soccer_stats.matches import load_heatmap, load_pass_network, load_xg_timeline
+from soccer_stats.spatial import HEATMAP_BINS, PITCH_LENGTH, PITCH_WIDTH
+from soccer_stats.query import frame_records
+
+router = APIRouter()
+
+@router.get("/matches/{match_id}/heatmap")
+async def match_heatmap(match_id: int, team: str | None = None, player: str | None = None,
+                        type: list[str] = Query(None)):
+    """
+    Events per cell of the pitch, for a team, a player and event types. `counts`
+    has one row per cell along the width, each with one count per cell along the length.
+    """
+    grid = await asyncio.to_thread(load_heatmap, match_id, team, player, type)
+    return {"match_id": match_id, "team": team, "player": player, "types": type,
+            "pitch": [PITCH_LENGTH, PITCH_WIDTH], "bins": list(HEATMAP_BINS), "counts": grid.tolist()}
+
+@router.get("/matches/{match_id}/pass_network/{team}")
+async def match_pass_network(match_id: int, team: str, min_passes: int = Query(1, ge=1)):
+    """
+    Pass network of a team: average position of each player, passes between
+    teammates (at least `min_passes`) and the adjacency matrix
+    """
+    network = await asyncio.to_thread(load_pass_network, match_id, team, min_passes)
+    if network["nodes"].empty:
+        raise HTTPException(status_code=404, detail=f"No passes found for team {team} in match {match_id}")
+    matrix = network["matrix"]
+    return {
+        "match_id": match_id, "team": team,
+        "nodes": frame_records(network["nodes"]),
+        "edges": frame_records(network["edges"]),
+        "matrix": {"players": matrix.index.tolist(), "passes": matrix.to_numpy().tolist()},
+    }
+
+@router.get("/matches/{match_id}/xg_timeline")
+async def match_xg_timeline(match_id: int):
+    """
+    Every shot of a match in order, with its xG and the running xG of its team
+    """
+    return {"match_id": match_id, "shots": frame_records(await asyncio.to_thread(load_xg_timeline, match_id))}
@@ -0,0 +1,25 @@
+import argparse
+import uvicorn
+import os
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    """
+    Run the API with several worker processes. Each worker has its own event
+    loop, StatsBomb client and LLM clients; match data and LLM responses are
+    shared between them through the on-disk match store and the SQLite cache.
+    """
+    parser = argparse.ArgumentParser(description="Serve the FastAPI app with several worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--limit-concurrency", type=int, default=None,
+                        help="connections per worker before new ones get a 503")
+    parser.add_argument("--backlog", type=int, default=2048)
+    args = parser.parse_args()
+    uvicorn.run("main:app", app_dir=APP_DIR, host=args.host, port=args.port, workers=args.workers,
+                limit_concurrency=args.limit_concurrency, backlog=args.backlog, timeout_keep_alive=5)
+
+if __name__ == "__main__":
+    main()
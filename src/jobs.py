@@ -0,0 +1,298 @@
+import threading
+import asyncio
+import sqlite3
+import uuid
+import json
+import time
+import os
+
+from caching import content_key
+from metrics import metrics
+
+JOBS_PATH = os.getenv("JOBS_PATH", os.path.join(os.path.expanduser("~"), ".cache", "soccer_stats", "jobs.sqlite"))
+# jobs run at the same time by each process
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+# seconds without a heartbeat after which a running job whose worker died is given to another worker
+JOB_LEASE = float(os.getenv("JOB_LEASE", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+# seconds finished jobs are kept
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+
+FINISHED = ("done", "failed", "cancelled")
+COLUMNS = ("id", "kind", "key", "params", "status", "result", "error", "attempts", "created_at", "started_at", "finished_at")
+# internal columns, added to queues created before them: when a retried job is due, and the last heartbeat of its worker
+SCHEDULING_COLUMNS = ("not_before", "heartbeat_at")
+
+class JobQueue:
+    """
+    Persistent queue of jobs in a SQLite file, shared by every process using
+    the same file.
+
+    A job is a `kind` (e.g. "match_summary") and its JSON parameters. It goes
+    from "pending" to "running" when a worker claims it, then to "done" with
+    its result or "failed" with the error. Submitting a job identical to one
+    still pending or running returns that job instead of a new one.
+    """
+    def __init__(self, path: str = JOBS_PATH, lease: float = JOB_LEASE, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.submitted = asyncio.Event()
+        # loop of the JobRunner waiting on `submitted`, set by JobRunner.start
+        self.loop = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs "
+            "(id TEXT PRIMARY KEY, kind TEXT, key TEXT, params TEXT, status TEXT, result TEXT, error TEXT, "
+            "attempts INTEGER DEFAULT 0, created_at REAL, started_at REAL, finished_at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+        self._transaction(self._add_scheduling_columns)
+
+    def _add_scheduling_columns(self, db):
+        existing = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+        for col in SCHEDULING_COLUMNS:
+            if col not in existing:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {col} REAL")
+
+    def _transaction(self, fn):
+        """
+        Run `fn(db)` in a write transaction, so a job is never claimed twice across processes
+        """
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.db)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return result
+
+    def _row(self, db, job_id: str) -> dict | None:
+        row = db.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        del job["key"]
+        return job
+
+    def submit(self, kind: str, params: dict) -> dict:
+        key = content_key(kind, params)
+
+        def insert(db):
+            row = db.execute("SELECT id FROM jobs WHERE key = ? AND status IN ('pending', 'running')", (key,)).fetchone()
+            if row is not None:
+                metrics.increment("jobs_deduplicated", kind=kind)
+                return row[0]
+            job_id = uuid.uuid4().hex
+            db.execute("INSERT INTO jobs (id, kind, key, params, status, created_at) VALUES (?, ?, ?, ?, 'pending', ?)",
+                       (job_id, kind, key, json.dumps(params, sort_keys=True), time.time()))
+            metrics.increment("jobs_submitted", kind=kind)
+            return job_id
+
+        job_id = self._transaction(insert)
+        # submit runs in a worker thread, the event can only be set from its loop
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.submitted.set)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self.lock:
+            return self._row(self.db, job_id)
+
+    def latest(self, kind: str, params: dict) -> dict | None:
+        """
+        The last job submitted with these parameters, whatever its status
+        """
+        with self.lock:
+            row = self.db.execute("SELECT id FROM jobs WHERE key = ? ORDER BY created_at DESC LIMIT 1",
+                                  (content_key(kind, params),)).fetchone()
+            return None if row is None else self._row(self.db, row[0])
+
+    def claim(self, kinds) -> dict | None:
+        """
+        Take the oldest pending job of the given kinds that is due, or a
+        running one whose worker stopped renewing its lease, and mark it as running
+        """
+        kinds = list(kinds)
+        placeholders = ", ".join("?" * len(kinds))
+
+        def take(db):
+            now = time.time()
+            db.execute("UPDATE jobs SET status = 'failed', error = 'Worker lost too many times', finished_at = ? "
+                       "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                       (now, now - self.lease, self.max_attempts))
+            row = db.execute(
+                f"SELECT id FROM jobs WHERE kind IN ({placeholders}) AND "
+                "((status = 'pending' AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (status = 'running' AND COALESCE(heartbeat_at, started_at) < ?)) ORDER BY created_at LIMIT 1",
+                (*kinds, now, now - self.lease),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (now, now, row[0]))
+            return self._row(db, row[0])
+
+        return self._transaction(take)
+
+    def finish(self, job_id: str, result: str | None = None, error: str | None = None):
+        status = "failed" if error is not None else "done"
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+            (status, result, error, time.time(), job_id)))
+
+    def release(self, job_id: str, delay: float = 0):
+        """
+        Put a running job back in the queue, e.g. when its worker shuts down,
+        to be claimed again `delay` seconds from now
+        """
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET status = 'pending', started_at = NULL, heartbeat_at = NULL, not_before = ?, "
+            "attempts = attempts - 1 WHERE id = ? AND status = 'running'", (time.time() + delay, job_id)))
+
+    def renew(self, job_id: str):
+        """
+        Extend the lease of a running job, its worker is still on it
+        """
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)))
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started yet
+        """
+        cursor = self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'pending'",
+            (time.time(), job_id)))
+        return cursor.rowcount > 0
+
+    def purge(self, older_than: float = JOB_RETENTION) -> int:
+        """
+        Remove the jobs finished more than `older_than` seconds ago
+        """
+        cursor = self._transaction(lambda db: db.execute(
+            f"DELETE FROM jobs WHERE status IN ({', '.join('?' for _ in FINISHED)}) AND finished_at < ?",
+            (*FINISHED, time.time() - older_than)))
+        return cursor.rowcount
+
+    async def wait(self, job_id: str, timeout: float, poll_interval: float = JOB_POLL_INTERVAL) -> dict | None:
+        """
+        The job once finished, or as it is after `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout
+        job = await asyncio.to_thread(self.get, job_id)
+        while job is not None and job["status"] not in FINISHED and time.monotonic() < deadline:
+            await asyncio.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+            job = await asyncio.to_thread(self.get, job_id)
+        return job
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+class RetryJob(Exception):
+    """
+    Raised by a job handler to put its job back in the queue, e.g. when the
+    LLM has no capacity left, and try again after `delay` seconds
+    """
+    def __init__(self, delay: float = 1.0):
+        super().__init__(f"retry in {delay}s")
+        self.delay = delay
+
+class JobRunner:
+    """
+    Runs the jobs of a queue in the event loop of this process, at most
+    `concurrency` at a time. `handlers` maps each job kind to a coroutine
+    function taking the job parameters and returning its result text.
+    """
+    def __init__(self, queue: JobQueue, handlers: dict, concurrency: int = JOB_CONCURRENCY,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.tasks = []
+
+    async def heartbeat(self, job_id: str):
+        """
+        Renew the lease of a job for as long as its handler runs
+        """
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            await asyncio.to_thread(self.queue.renew, job_id)
+
+    async def run(self, job: dict):
+        with metrics.span("job", kind=job["kind"]):
+            heartbeat = asyncio.create_task(self.heartbeat(job["id"]))
+            try:
+                result = await self.handlers[job["kind"]](**job["params"])
+            except asyncio.CancelledError:
+                self.queue.release(job["id"])
+                raise
+            except RetryJob as e:
+                # not due before the delay, so no worker claims it again right away
+                await asyncio.to_thread(self.queue.release, job["id"], e.delay)
+                return
+            except Exception as e:
+                await asyncio.to_thread(self.queue.finish, job["id"], error=f"{type(e).__name__}: {e}")
+                return
+            finally:
+                heartbeat.cancel()
+            await asyncio.to_thread(self.queue.finish, job["id"], result=result)
+
+    async def work(self):
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, self.handlers)
+            if job is not None:
+                await self.run(job)
+                continue
+            # new jobs of this process wake the worker up, jobs of other processes are polled
+            self.queue.submitted.clear()
+            try:
+                await asyncio.wait_for(self.queue.submitted.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self.queue.submitted = asyncio.Event()
+        self.queue.loop = asyncio.get_running_loop()
+        self.queue.purge()
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """
+        Stop the workers, their running jobs go back to the queue for the next start
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the process wide job queue
+    """
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+def close_job_queue():
+    global _job_queue
+    if _job_queue is not None:
+        _job_queue.close()
+        _job_queue = None
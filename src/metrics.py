@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from collections import deque
+from functools import wraps
+import threading
+import time
+import os
+
+# timings kept per series to compute the percentiles
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+
+def series_key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+class Timing:
+    """
+    Count, sum, min and max of a timed operation, and its last durations for percentiles
+    """
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.errors += error
+        self.recent.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count, "errors": self.errors, "total_seconds": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3), "p99_ms": round(self.percentile(99) * 1000, 3),
+            "min_ms": round((self.min or 0) * 1000, 3), "max_ms": round((self.max or 0) * 1000, 3),
+        }
+
+class Metrics:
+    """
+    In-process registry of counters and timings, labelled like Prometheus
+    series (e.g. span "statsbomb" with label call="events"). Nothing leaves
+    the process: the app exposes it at /metrics and in the Streamlit debug panel.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, error: bool = False, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = Timing()
+            timing.observe(seconds, error)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        Time the block as one observation of the `name` series
+        """
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error, **labels)
+
+    def timed(self, name: str, **labels):
+        """
+        Decorator timing every call of a function as a span
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "worker": os.getpid(),
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "timings": [{"name": name, "labels": dict(labels), **timing.to_dict()}
+                            for (name, labels), timing in sorted(self.timings.items())],
+            }
+
+    def prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text format; timings are exposed as
+        summaries. Every series carries the pid of the process as a "worker"
+        label, each API worker having its own registry.
+        """
+        worker = os.getpid()
+
+        def series(name, labels, extra=()):
+            pairs = [("worker", worker), *labels, *extra]
+            label_text = ",".join(f'{k}="{v}"' for k, v in pairs)
+            return f"soccer_stats_{name}{{{label_text}}}"
+
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{series(name + '_total', labels)} {value}")
+            for (name, labels), timing in sorted(self.timings.items()):
+                for q in (0.5, 0.99):
+                    lines.append(f"{series(name + '_seconds', labels, [('quantile', q)])} {timing.percentile(q * 100)}")
+                lines.append(f"{series(name + '_seconds_count', labels)} {timing.count}")
+                lines.append(f"{series(name + '_seconds_sum', labels)} {timing.total}")
+                lines.append(f"{series(name + '_errors_total', labels)} {timing.errors}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.timings.clear()
+
+metrics = Metrics()
+
+def span(name: str, **labels):
+    return metrics.span(name, **labels)
+
+def timed(name: str, **labels):
+    return metrics.timed(name, **labels)
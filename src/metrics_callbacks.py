@@ -0,0 +1,55 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from soccer_stats.digest import estimate_tokens
+from metrics import Metrics, metrics
+import time
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records the duration and token counts of LLM calls and the duration of
+    tool calls. Token counts come from the provider usage metadata when
+    present, otherwise they are estimated from the text.
+    """
+    def __init__(self, metrics: Metrics = metrics):
+        self.metrics = metrics
+        self.started = {}
+        self.prompt_tokens = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.started[run_id] = (time.perf_counter(), (serialized or {}).get("kwargs", {}).get("model", "llm"))
+        self.prompt_tokens[run_id] = sum(estimate_tokens(prompt) for prompt in prompts)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, model = self.started.pop(run_id, (None, "llm"))
+        if start is not None:
+            self.metrics.observe("llm", time.perf_counter() - start, model=model)
+        usage = (response.llm_output or {}).get("usage_metadata") or (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_token_count", usage.get("prompt_tokens"))
+        completion_tokens = usage.get("candidates_token_count", usage.get("completion_tokens"))
+        if prompt_tokens is None:
+            prompt_tokens = self.prompt_tokens.get(run_id, 0)
+        if completion_tokens is None:
+            completion_tokens = sum(estimate_tokens(g.text) for gens in response.generations for g in gens)
+        self.prompt_tokens.pop(run_id, None)
+        self.metrics.increment("llm_prompt_tokens", prompt_tokens, model=model)
+        self.metrics.increment("llm_completion_tokens", completion_tokens, model=model)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start, model = self.started.pop(run_id, (None, "llm"))
+        self.prompt_tokens.pop(run_id, None)
+        if start is not None:
+            self.metrics.observe("llm", time.perf_counter() - start, error=True, model=model)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.started[run_id] = (time.perf_counter(), (serialized or {}).get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        start, tool = self.started.pop(run_id, (None, "tool"))
+        if start is not None:
+            self.metrics.observe("tool", time.perf_counter() - start, tool=tool)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        start, tool = self.started.pop(run_id, (None, "tool"))
+        if start is not None:
+            self.metrics.observe("tool", time.perf_counter() - start, error=True, tool=tool)
+
+metrics_handler = MetricsCallbackHandler()
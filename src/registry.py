@@ -0,0 +1,69 @@
+import threading
+import time
+
+class Registry:
+    """
+    Process wide registry of long-lived objects (LLM clients, tools, agents).
+
+    Objects are built lazily by their factory on first use and then shared
+    by every caller (Streamlit sessions, API requests). `refresh` drops
+    them so they are built again on the next use.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.objects = {}
+        self.created_at = {}
+
+    def get(self, key, factory):
+        obj = self.objects.get(key)
+        if obj is not None:
+            return obj
+        with self.lock:
+            if key not in self.objects:
+                self.objects[key] = factory()
+                self.created_at[key] = time.time()
+            return self.objects[key]
+
+    def set(self, key, obj):
+        """
+        Register an already built object, e.g. a stub in the benchmarks
+        """
+        with self.lock:
+            self.objects[key] = obj
+            self.created_at[key] = time.time()
+
+    def refresh(self, key=None):
+        """
+        Drop one object, or every object when no key is given
+        """
+        with self.lock:
+            if key is None:
+                self.objects.clear()
+                self.created_at.clear()
+            else:
+                self.objects.pop(key, None)
+                self.created_at.pop(key, None)
+
+    def health(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {
+                "status": "ok",
+                "objects": {str(key): {"type": type(obj).__name__, "age_seconds": round(now - self.created_at[key], 1)}
+                            for key, obj in self.objects.items()},
+            }
+
+registry = Registry()
+
+def get_llm(model: str, temperature: float | None = None):
+    """
+    Get the shared Gemini client for a model and temperature
+    """
+    return registry.get(("llm", model, temperature), lambda: build_llm(model, temperature))
+
+def build_llm(model: str, temperature: float | None = None):
+    # the Gemini SDK is slow to import, only load it when a client is needed
+    from langchain_google_genai import GoogleGenerativeAI
+    from metrics_callbacks import metrics_handler
+    kwargs = {} if temperature is None else {"temperature": temperature}
+    return GoogleGenerativeAI(model=model, callbacks=[metrics_handler], **kwargs)
@@ -0,0 +1,128 @@
+from statsbombpy.config import DEFAULT_CREDS, OPEN_DATA_PATHS
+from soccer_stats import open_data, store
+from metrics import span
+import pandas as pd
+import asyncio
+import aiohttp
+import os
+
+MAX_CONCURRENCY = int(os.getenv("STATSBOMB_MAX_CONCURRENCY", "8"))
+REQUEST_TIMEOUT = float(os.getenv("STATSBOMB_REQUEST_TIMEOUT", "30"))
+
+def has_credentials() -> bool:
+    """
+    Whether StatsBomb API credentials are set, the API client (and its HTTP cache) is only imported here
+    """
+    from statsbombpy import api_client
+    return api_client.has_auth(DEFAULT_CREDS)
+
+class AsyncStatsBombClient:
+    """
+    Asyncio client for the StatsBomb open data.
+
+    All requests share one aiohttp session (and its connection pool), at most
+    `max_concurrency` upstream fetches run at the same time, and concurrent
+    calls for the same resource wait on a single in-flight fetch.
+    Lineups and events are read through the local match store.
+    """
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session: aiohttp.ClientSession | None = None
+        self.in_flight: dict[tuple, asyncio.Task] = {}
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _get_json(self, kind: str, *parts: str, **params):
+        """
+        Get one raw open-data JSON document, from the local checkout in offline mode
+        """
+        async with self.semaphore:
+            with span("statsbomb", call=kind):
+                if open_data.is_offline():
+                    return await asyncio.to_thread(open_data.read_json, *parts)
+                async with self._session().get(OPEN_DATA_PATHS[kind].format(**params)) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+
+    async def _single_flight(self, key: tuple, fetch):
+        """
+        Run `fetch()` once for all the concurrent callers asking for the same key
+        """
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def competitions(self) -> pd.DataFrame:
+        async def fetch():
+            raw = await self._get_json("competitions", "competitions.json")
+            return open_data.competitions_frame(raw)
+        return await self._single_flight(("competitions",), fetch)
+
+    async def matches(self, competition_id: int, season_id: int) -> pd.DataFrame:
+        async def fetch():
+            raw = await self._get_json("matches", "matches", str(competition_id), f"{season_id}.json",
+                                       competition_id=competition_id, season_id=season_id)
+            return await asyncio.to_thread(open_data.matches_frame, raw)
+        return await self._single_flight(("matches", competition_id, season_id), fetch)
+
+    async def lineups(self, match_id: int) -> dict:
+        async def fetch():
+            lineups = await asyncio.to_thread(store.cached_lineups, match_id)
+            if lineups is not None:
+                return lineups
+            if has_credentials():
+                async with self.semaphore:
+                    lineups = await asyncio.to_thread(store.fetch_lineups, match_id)
+            else:
+                raw = await self._get_json("lineups", "lineups", f"{match_id}.json", match_id=match_id)
+                lineups = open_data.lineups_frames(raw)
+            await asyncio.to_thread(store.save_lineups, match_id, lineups)
+            return lineups
+        return await self._single_flight(("lineups", int(match_id)), fetch)
+
+    async def events(self, match_id: int) -> pd.DataFrame:
+        async def fetch():
+            events = await asyncio.to_thread(store.cached_events, match_id)
+            if events is not None:
+                return events
+            if has_credentials():
+                async with self.semaphore:
+                    events = await asyncio.to_thread(store.fetch_events, match_id)
+            else:
+                raw = await self._get_json("events", "events", f"{match_id}.json", match_id=match_id)
+                events = await asyncio.to_thread(open_data.events_frame, raw, match_id)
+            return await asyncio.to_thread(store.save_events, match_id, events)
+        return await self._single_flight(("events", int(match_id)), fetch)
+
+_client = None
+
+def get_client() -> AsyncStatsBombClient:
+    """
+    Get the process wide async client
+    """
+    global _client
+    if _client is None:
+        _client = AsyncStatsBombClient()
+    return _client
+
+async def close_client():
+    """
+    Close the connection pool of the process wide client, if it was ever used
+    """
+    if _client is not None:
+        await _client.close()
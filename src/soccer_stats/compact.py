@@ -0,0 +1,262 @@
+from soccer_stats.store import get_store, load_events
+from soccer_stats.competitions import load_matches
+import numpy as np
+import pandas as pd
+import threading
+import shutil
+import json
+import os
+
+# bump when the layout changes, older files are then ignored
+COMPACT_VERSION = 1
+# store kind of the compact events: one directory per match, in the manifest like the Parquet files
+COMPACT_KIND = f"compact/v{COMPACT_VERSION}"
+
+# columns kept as numbers, with their numpy type
+INT_COLUMNS = {"index": "i4", "period": "i1", "minute": "i2", "second": "i1", "possession": "i4"}
+FLOAT_COLUMNS = {"duration": "f8", "shot_statsbomb_xg": "f8"}
+# flags StatsBomb only sets when true, kept as booleans
+BOOL_COLUMNS = ["pass_shot_assist", "pass_goal_assist", "under_pressure"]
+# text columns kept as dictionary codes, -1 when missing
+CATEGORY_COLUMNS = [
+    "type", "team", "player", "position", "possession_team", "play_pattern",
+    "pass_outcome", "pass_height", "pass_type", "pass_recipient",
+    "shot_outcome", "shot_type", "dribble_outcome", "foul_committed_card", "bad_behaviour_card",
+    "substitution_outcome", "substitution_replacement",
+]
+# analysis columns derived from the nested locations, the locations themselves stay in the attributes
+LOCATION_COLUMNS = {
+    "location_x": (["location"], 0), "location_y": (["location"], 1),
+    "end_location_x": (["pass_end_location", "carry_end_location", "shot_end_location"], 0),
+    "end_location_y": (["pass_end_location", "carry_end_location", "shot_end_location"], 1),
+}
+CORE_COLUMNS = [*INT_COLUMNS, *FLOAT_COLUMNS, *BOOL_COLUMNS, *CATEGORY_COLUMNS]
+
+def is_missing(value) -> bool:
+    """
+    Whether a single event attribute is empty (None or NaN)
+    """
+    return not isinstance(value, (dict, list)) and pd.isna(value)
+
+def location_values(events: pd.DataFrame, names: list[str], axis: int) -> np.ndarray:
+    """
+    One coordinate of the first location present among `names`, NaN when there is none
+    """
+    values = np.full(len(events), np.nan, dtype="f4")
+    for name in reversed(names):
+        if name in events:
+            coordinate = events[name].map(lambda v: v[axis] if isinstance(v, list) and len(v) > axis else np.nan)
+            values = np.where(coordinate.notna(), coordinate.to_numpy(dtype="f4", na_value=np.nan), values)
+    return values.astype("f4")
+
+def encode_attributes(events: pd.DataFrame, raw_columns=()) -> tuple[bytes, np.ndarray]:
+    """
+    The columns not kept in the core, one JSON object per event without its
+    missing values, concatenated; and the offset of each object. Values of
+    `raw_columns` are already JSON and are copied as they are.
+    """
+    side = events.drop(columns=[col for col in CORE_COLUMNS if col in events])
+    # one '"key": value' fragment per present value, each distinct value dumped once per column
+    fragments = np.full((len(side), len(side.columns)), "", dtype=object)
+    for i, col in enumerate(side.columns):
+        present = side[col].notna().to_numpy()
+        values = side[col][present]
+        try:
+            codes, uniques = pd.factorize(values)
+            uniques = uniques.tolist()
+        except TypeError:
+            # decoded nested values (lists, dicts) are not hashable
+            codes, uniques = np.arange(len(values)), values.tolist()
+        dumped = uniques if col in raw_columns else [json.dumps(value, default=str) for value in uniques]
+        prefix = json.dumps(col) + ": "
+        fragments[present, i] = np.array([prefix + value for value in dumped] + [""], dtype=object)[codes]
+    blobs = [("{" + ", ".join(filter(None, row)) + "}").encode("utf-8") for row in fragments.tolist()]
+    offsets = np.zeros(len(blobs) + 1, dtype="i8")
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    return b"".join(blobs), offsets
+
+def encode_events(events: pd.DataFrame, json_columns=()) -> tuple[np.ndarray, dict, bytes, np.ndarray]:
+    """
+    Split a statsbombpy events frame into a numpy record array of the core
+    columns (numbers and dictionary codes), the dictionaries, and the
+    attributes of every event.
+
+    The frame can also be the stored one, with its nested `json_columns`
+    still JSON strings: only the core and location columns among them are
+    decoded, the others are copied to the attributes as they are.
+    """
+    needed = set(CORE_COLUMNS).union(*(names for names, _ in LOCATION_COLUMNS.values()))
+    decoded = [col for col in json_columns if col in events and col in needed]
+    events = events.assign(**{col: events[col].map(lambda v: json.loads(v) if isinstance(v, str) else None)
+                              for col in decoded})
+    raw_columns = [col for col in json_columns if col not in decoded]
+    dictionaries = {}
+    codes = {}
+    for col in CATEGORY_COLUMNS:
+        values = events[col] if col in events else pd.Series(None, index=events.index, dtype=object)
+        categorical = pd.Categorical(values.where(values.map(lambda v: isinstance(v, str)), None))
+        dictionaries[col] = categorical.categories.tolist()
+        codes[col] = categorical.codes
+    dtype = [(col, t) for col, t in {**INT_COLUMNS, **FLOAT_COLUMNS}.items()]
+    dtype += [(col, "?") for col in BOOL_COLUMNS]
+    dtype += [(col, "i2" if len(dictionaries[col]) < 2**15 else "i4") for col in CATEGORY_COLUMNS]
+    dtype += [(col, "f4") for col in LOCATION_COLUMNS]
+    records = np.zeros(len(events), dtype=dtype)
+    for col in INT_COLUMNS:
+        records[col] = events[col].to_numpy() if col in events else 0
+    for col in FLOAT_COLUMNS:
+        records[col] = pd.to_numeric(events[col]).to_numpy(dtype="f8", na_value=np.nan) if col in events else np.nan
+    for col in BOOL_COLUMNS:
+        records[col] = (events[col] == True).to_numpy() if col in events else False
+    for col in CATEGORY_COLUMNS:
+        records[col] = codes[col]
+    for col, (names, axis) in LOCATION_COLUMNS.items():
+        records[col] = location_values(events, names, axis)
+    return (records, dictionaries, *encode_attributes(events, raw_columns))
+
+class Attributes:
+    """
+    The attributes of every event not kept in the core columns, decoded only
+    for the rows asked for. On disk the data and offsets are memory-mapped.
+    """
+    def __init__(self, data, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def get(self, row: int) -> dict:
+        return json.loads(bytes(self.data[self.offsets[row]:self.offsets[row + 1]]))
+
+    def column(self, name: str, rows=None) -> list:
+        rows = range(len(self.offsets) - 1) if rows is None else rows
+        return [self.get(row).get(name) for row in rows]
+
+class CompactEvents:
+    """
+    Compact form of the events of a match: a numpy record array with the
+    numbers, the dictionary codes of the text columns and the x, y of the
+    locations, plus the nested attributes decoded on demand.
+
+    `frame()` gives the core columns as a DataFrame with categorical columns,
+    which the soccer_stats functions (player stats, team totals, digests)
+    accept in place of the statsbombpy frame.
+    """
+    def __init__(self, records: np.ndarray, dictionaries: dict, attributes: Attributes):
+        self.records = records
+        self.dictionaries = dictionaries
+        self.attributes = attributes
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, name: str) -> pd.Series:
+        if name in self.dictionaries:
+            return pd.Series(pd.Categorical.from_codes(np.asarray(self.records[name]), self.dictionaries[name]), name=name)
+        if name in self.records.dtype.names:
+            return pd.Series(np.asarray(self.records[name]), name=name)
+        return pd.Series(self.attributes.column(name), name=name, dtype=object)
+
+    def frame(self, columns: list[str] | None = None) -> pd.DataFrame:
+        columns = list(self.records.dtype.names) if columns is None else columns
+        return pd.DataFrame({col: self.column(col) for col in columns})
+
+    def records_at(self, rows) -> list[dict]:
+        """
+        The events at the given rows as dicts, with the same keys and values as
+        the rows of the statsbombpy frame without their missing values
+        """
+        core = self.frame(CORE_COLUMNS).iloc[rows]
+        events = []
+        for row, event in zip(rows, core.to_dict(orient="records")):
+            event = {k: v for k, v in event.items() if not is_missing(v) and v is not False}
+            event.update(self.attributes.get(row))
+            events.append(event)
+        return events
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of the core columns; the attributes are not loaded
+        """
+        return self.records.nbytes + sum(len(json.dumps(values)) for values in self.dictionaries.values())
+
+def compact_events(events: pd.DataFrame) -> CompactEvents:
+    records, dictionaries, data, offsets = encode_events(events)
+    return CompactEvents(records, dictionaries, Attributes(data, offsets))
+
+def write_compact(match_id: int, events: pd.DataFrame, json_columns=()):
+    """
+    Write the compact events of a match to the store as numpy and raw files,
+    to be memory-mapped on read
+    """
+    records, dictionaries, data, offsets = encode_events(events, json_columns)
+    store = get_store()
+    tmp_path = f"{store.dir_path(COMPACT_KIND, match_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "records.npy"), records)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    with open(os.path.join(tmp_path, "attributes.bin"), "wb") as f:
+        f.write(data)
+    with open(os.path.join(tmp_path, "dictionaries.json"), "w", encoding="utf-8") as f:
+        json.dump(dictionaries, f)
+    store.put_dir(COMPACT_KIND, match_id, tmp_path)
+
+def read_compact(match_id: int) -> CompactEvents | None:
+    path = get_store().get_dir(COMPACT_KIND, match_id)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "dictionaries.json"), encoding="utf-8") as f:
+            dictionaries = json.load(f)
+        attributes_path = os.path.join(path, "attributes.bin")
+        data = np.memmap(attributes_path, dtype="u1", mode="r") if os.path.getsize(attributes_path) else b""
+        return CompactEvents(np.load(os.path.join(path, "records.npy"), mmap_mode="r"), dictionaries,
+                             Attributes(data, np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")))
+    except FileNotFoundError:
+        # evicted or rewritten by another process while opening, mapped files stay readable once open
+        return None
+
+def load_compact(match_id: int) -> CompactEvents:
+    """
+    Get the compact events of a match, memory-mapped from the store, writing
+    them the first time from the stored Parquet file, whose nested columns
+    are not decoded. When the files are evicted or rewritten as fast as they
+    are written, they are built in memory from the events instead.
+    """
+    store = get_store()
+    for _ in range(2):
+        compact = read_compact(match_id)
+        if compact is not None:
+            return compact
+        if store.entry("events", match_id) is None:
+            load_events(match_id)
+        entry = store.entry("events", match_id)
+        events = store.get("events", match_id, decode=False)
+        if entry is not None and events is not None:
+            write_compact(match_id, events, entry["json_columns"])
+    return read_compact(match_id) or compact_events(load_events(match_id))
+
+def remove_compact(match_id: int):
+    get_store().remove_dir(COMPACT_KIND, match_id)
+
+def load_season_compact(competition_id: int, season_id: int) -> dict[int, CompactEvents]:
+    """
+    The compact events of every match of a season, by match id
+    """
+    return {int(match_id): load_compact(match_id) for match_id in load_matches(competition_id, season_id)["match_id"]}
+
+def season_frame(competition_id: int, season_id: int, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    The core columns of every event of a season in one frame, with a match_id column
+    """
+    frames = [compact.frame(columns).assign(match_id=match_id)
+              for match_id, compact in load_season_compact(competition_id, season_id).items()]
+    if not frames:
+        return pd.DataFrame()
+    # same categories in every match, so the concatenated columns stay categorical
+    for col in CATEGORY_COLUMNS:
+        if col in frames[0]:
+            dtype = pd.CategoricalDtype(sorted(set().union(*(frame[col].cat.categories for frame in frames))))
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(dtype.categories)
+    return pd.concat(frames, ignore_index=True)
@@ -1,14 +1,36 @@
-from statsbombpy import sb
+from soccer_stats import open_data
+from metrics import span
+import pandas as pd
 import json
 
+def load_competitions() -> pd.DataFrame:
+    """
+    Gets all competitions available in the StatsBomb API as a DataFrame
+    """
+    with span("statsbomb", call="competitions"):
+        if open_data.is_offline():
+            return open_data.competitions()
+        from statsbombpy import sb
+        return sb.competitions()
+
+def load_matches(competition_id: int, season_id: int) -> pd.DataFrame:
+    """
+    Gets all matches for a given competition and season as a DataFrame
+    """
+    with span("statsbomb", call="matches"):
+        if open_data.is_offline():
+            return open_data.matches(competition_id, season_id)
+        from statsbombpy import sb
+        return sb.matches(competition_id=competition_id, season_id=season_id)
+
 def get_competitions() -> str:
     """
     Gets all competitions available in the StatsBomb API
     """
-    return json.dumps(sb.competitions().to_dict(orient='records'))
+    return json.dumps(load_competitions().to_dict(orient='records'))
 
 def get_matches(competition_id: int, season_id: int) -> str:
     """
     Gets all matches for a given competition and season
     """
-    return json.dumps(sb.matches(competition_id=competition_id, season_id=season_id).to_dict(orient='records'))
+    return json.dumps(load_matches(competition_id, season_id).to_dict(orient='records'))
@@ -0,0 +1,130 @@
+from soccer_stats.stats import card_column, column, compute_team_totals
+import pandas as pd
+import os
+
+MATCH_SUMMARY_TOKEN_BUDGET = int(os.getenv("MATCH_SUMMARY_TOKEN_BUDGET", "2000"))
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a text, about 4 characters per token
+    """
+    return len(text) // 4 + 1
+
+def attr(event, name: str, default=None):
+    """
+    Get an attribute of a single event, or `default` when it is missing or NaN
+    """
+    value = event.get(name)
+    if value is None or (not isinstance(value, (dict, list)) and pd.isna(value)):
+        return default
+    return value
+
+def minute(event) -> str:
+    return f"{int(event['minute'])}'"
+
+def team_totals(events: pd.DataFrame) -> list[str]:
+    """
+    One line of aggregates per team
+    """
+    return [
+        f"{row.Index}: {row.goals} goals, {row.shots} shots ({row.shots_on_target} on target, xG {row.xg:.2f}), "
+        f"{row.passes_completed}/{row.passes_attempted} passes completed, {row.fouls} fouls, {row.cards} cards"
+        for row in compute_team_totals(events).itertuples()
+    ]
+
+def card_events(events: pd.DataFrame) -> pd.DataFrame:
+    card = card_column(events)
+    return events.assign(card=card)[card.notna()]
+
+def goals(events: pd.DataFrame) -> list[str]:
+    shots = events[(events["type"] == "Shot") & (column(events, "shot_outcome") == "Goal")]
+    own_goals = events[events["type"] == "Own Goal Against"]
+    lines = [
+        (event["minute"], f"{minute(event)} GOAL {event['team']} - {event['player']} "
+                          f"({attr(event, 'shot_type', 'Open Play')}, xG {attr(event, 'shot_statsbomb_xg', 0):.2f})")
+        for _, event in shots.iterrows()
+    ] + [
+        (event["minute"], f"{minute(event)} OWN GOAL by {event['player']} ({event['team']})")
+        for _, event in own_goals.iterrows()
+    ]
+    return [line for _, line in sorted(lines)]
+
+def cards(events: pd.DataFrame) -> list[str]:
+    return [
+        f"{minute(event)} {event['card'].upper()} {event['team']} - {event['player']}"
+        for _, event in card_events(events).sort_values("minute", kind="stable").iterrows()
+    ]
+
+def substitutions(events: pd.DataFrame) -> list[str]:
+    subs = events[events["type"] == "Substitution"].sort_values("minute", kind="stable")
+    return [
+        f"{minute(event)} SUB {event['team']} - {attr(event, 'substitution_replacement')} on for {event['player']}"
+        for _, event in subs.iterrows()
+    ]
+
+def shots(events: pd.DataFrame) -> list[str]:
+    """
+    Shots that were not goals, most dangerous (highest xG) first
+    """
+    shots = events[(events["type"] == "Shot") & (column(events, "shot_outcome") != "Goal")]
+    shots = shots.assign(xg=pd.to_numeric(column(shots, "shot_statsbomb_xg")).fillna(0)).sort_values("xg", ascending=False)
+    return [
+        f"{minute(event)} SHOT {event['team']} - {event['player']}: {attr(event, 'shot_outcome')} (xG {event['xg']:.2f})"
+        for _, event in shots.iterrows()
+    ]
+
+def key_passes(events: pd.DataFrame) -> list[str]:
+    is_key = (column(events, "pass_shot_assist") == True) | (column(events, "pass_goal_assist") == True)
+    passes = events[(events["type"] == "Pass") & is_key].sort_values("minute", kind="stable")
+    return [
+        f"{minute(event)} KEY PASS {event['team']} - {event['player']} to {attr(event, 'pass_recipient')}"
+        for _, event in passes.iterrows()
+    ]
+
+# digest sections, most important first; lower sections are cut when the budget runs out
+SECTIONS = [
+    ("Team totals", team_totals),
+    ("Goals", goals),
+    ("Cards", cards),
+    ("Substitutions", substitutions),
+    ("Shots", shots),
+    ("Key passes", key_passes),
+]
+
+def build_match_digest(events: pd.DataFrame, token_budget: int = MATCH_SUMMARY_TOKEN_BUDGET) -> str:
+    """
+    Reduce the events of a match to a compact, ranked text digest for an LLM prompt
+
+    Sections are added in order of importance, line by line, until the
+    estimated size of the digest reaches `token_budget` tokens.
+    """
+    lines = []
+    used = 0
+    for title, build in SECTIONS:
+        section = build(events)
+        if not section:
+            continue
+        header = f"# {title}"
+        if used + estimate_tokens(header) > token_budget:
+            break
+        lines.append(header)
+        used += estimate_tokens(header)
+        for i, line in enumerate(section):
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                lines.append(f"(+{len(section) - i} more)")
+                return "\n".join(lines)
+            lines.append(line)
+            used += cost
+    return "\n".join(lines)
+
+def build_period_digests(events: pd.DataFrame, token_budget: int = MATCH_SUMMARY_TOKEN_BUDGET) -> dict[int, str]:
+    """
+    One digest per period of the match, splitting the budget between them,
+    for a map-reduce summary
+    """
+    periods = sorted(events["period"].dropna().unique())
+    return {
+        int(period): build_match_digest(events[events["period"] == period], token_budget // max(len(periods), 1))
+        for period in periods
+    }
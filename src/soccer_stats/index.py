@@ -0,0 +1,134 @@
+from soccer_stats.competitions import load_competitions, load_matches
+import threading
+import time
+import os
+
+INDEX_TTL = float(os.getenv("SOCCER_STATS_INDEX_TTL", "3600"))
+
+def match_name(match: dict) -> str:
+    """
+    The display name of a match, as shown in the app
+    """
+    return f"{match['home_team']} vs {match['away_team']}"
+
+class MatchIndex:
+    """
+    In-memory lookup tables over the competitions and matches, so finding a
+    competition, season, match or the matches of a team is a dict lookup
+    instead of a scan.
+    Every table expires after `ttl` seconds and is rebuilt on the next access.
+    """
+    def __init__(self, ttl: float = INDEX_TTL):
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drop every table, they are rebuilt on the next access
+        """
+        with self.lock:
+            self.competitions_loaded_at = None
+            self.competitions = []
+            self.seasons = {}
+            self.season_ids = {}
+            self.matches = {}
+            self.matches_by_id = {}
+            self.matches_by_name = {}
+            self.matches_by_team = {}
+
+    def _expired(self, loaded_at: float | None) -> bool:
+        return loaded_at is None or time.monotonic() - loaded_at > self.ttl
+
+    def _load_competitions(self):
+        with self.lock:
+            if not self._expired(self.competitions_loaded_at):
+                return
+            competitions = load_competitions().to_dict(orient='records')
+            seasons, season_ids = {}, {}
+            for comp in competitions:
+                seasons.setdefault(comp['competition_name'], set()).add(comp['season_name'])
+                season_ids[(comp['competition_name'], comp['season_name'])] = (comp['competition_id'], comp['season_id'])
+            self.competitions = competitions
+            self.seasons = {name: sorted(names) for name, names in seasons.items()}
+            self.season_ids = season_ids
+            self.competitions_loaded_at = time.monotonic()
+
+    def _load_matches(self, competition_id: int, season_id: int) -> list:
+        key = (int(competition_id), int(season_id))
+        with self.lock:
+            loaded_at, matches = self.matches.get(key, (None, []))
+            if not self._expired(loaded_at):
+                return matches
+            matches = load_matches(*key).to_dict(orient='records')
+            self.matches[key] = (time.monotonic(), matches)
+            for match in matches:
+                self.matches_by_id[match['match_id']] = (key, match)
+                self.matches_by_name[(*key, match_name(match))] = match
+                for team in (match['home_team'], match['away_team']):
+                    self.matches_by_team.setdefault(team, {})[match['match_id']] = (key, match)
+            return matches
+
+    def competition_names(self) -> list:
+        self._load_competitions()
+        return sorted(self.seasons)
+
+    def season_names(self, competition_name: str) -> list:
+        self._load_competitions()
+        return self.seasons.get(competition_name, [])
+
+    def get_season_ids(self, competition_name: str, season_name: str) -> tuple:
+        """
+        Get the (competition_id, season_id) of a competition season by name
+        """
+        self._load_competitions()
+        return self.season_ids.get((competition_name, season_name), (None, None))
+
+    def get_matches(self, competition_id: int, season_id: int) -> list:
+        return self._load_matches(competition_id, season_id)
+
+    def match_names(self, competition_id: int, season_id: int) -> list:
+        return sorted(match_name(match) for match in self._load_matches(competition_id, season_id))
+
+    def get_match_by_name(self, competition_id: int, season_id: int, name: str) -> dict | None:
+        self._load_matches(competition_id, season_id)
+        return self.matches_by_name.get((int(competition_id), int(season_id), name))
+
+    def get_match(self, match_id: int, competition_id: int = None, season_id: int = None) -> dict | None:
+        """
+        Get the details of a match. The season is loaded first when given,
+        otherwise only the seasons already indexed are searched.
+        """
+        if competition_id is not None and season_id is not None:
+            self._load_matches(competition_id, season_id)
+        key, match = self.matches_by_id.get(int(match_id), (None, None))
+        if key is not None and self._expired(self.matches[key][0]):
+            return self.get_match(match_id, *key)
+        return match
+
+    def get_team_matches(self, team: str, competition_id: int = None, season_id: int = None) -> list:
+        """
+        Get the matches of a team by name, in date order. With a season, that
+        season is loaded and only its matches are returned, otherwise the
+        matches of every season already indexed.
+        """
+        if competition_id is not None and season_id is not None:
+            self._load_matches(competition_id, season_id)
+            season = (int(competition_id), int(season_id))
+        else:
+            season = None
+        with self.lock:
+            matches = [match for key, match in self.matches_by_team.get(team, {}).values()
+                       if season is None or key == season]
+        return sorted(matches, key=lambda match: (str(match.get('match_date')), match['match_id']))
+
+_index = None
+
+def get_index() -> MatchIndex:
+    """
+    Get the process wide match index, shared by the app and the agent tools
+    """
+    global _index
+    if _index is None:
+        _index = MatchIndex()
+    return _index
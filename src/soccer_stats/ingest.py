@@ -0,0 +1,141 @@
+from soccer_stats.stats import card_column, column, compute_player_stats_table, compute_team_totals
+from soccer_stats.store import get_store, load_events, load_lineups
+from soccer_stats.compact import remove_compact
+from soccer_stats.spatial import spatial_tables
+import pandas as pd
+import threading
+
+# bump when the layout of a derived table changes, older tables are then ignored
+SCHEMA_VERSION = 3
+DERIVED_TABLES = ["player_stats", "player_minutes", "team_totals", "starting_xi", "substitutions", "timeline", "event_index",
+                  "heatmap", "pass_network", "average_positions", "xg_timeline"]
+
+# one lock per match, so concurrent requests for a match without tables ingest it once
+_ingest_locks: dict[int, threading.Lock] = {}
+_ingest_locks_lock = threading.Lock()
+
+def table_kind(name: str) -> str:
+    return f"derived/v{SCHEMA_VERSION}/{name}"
+
+def starting_xi_table(lineups: dict) -> pd.DataFrame:
+    rows = []
+    for team, df in lineups.items():
+        for player in df.sort_values("jersey_number").to_dict(orient="records"):
+            positions = player["positions"] if isinstance(player["positions"], list) else []
+            if positions and positions[0].get("start_reason") == "Starting XI":
+                rows.append({"team": team, "player": player["player_name"],
+                             "position": positions[0].get("position"), "jersey_number": player["jersey_number"]})
+    return pd.DataFrame(rows, columns=["team", "player", "position", "jersey_number"])
+
+def clock_minutes(clock: str) -> float:
+    """
+    Minutes of a "MM:SS" match clock
+    """
+    minutes, seconds = clock.split(":")
+    return int(minutes) + int(seconds) / 60
+
+def player_minutes_table(lineups: dict, events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Minutes played by every player who took the field, from the positions of the lineups
+    """
+    match_end = (events["minute"] * 60 + events["second"]).max() / 60 if not events.empty else 90.0
+    rows = []
+    for team, df in lineups.items():
+        for player in df.to_dict(orient="records"):
+            positions = player["positions"] if isinstance(player["positions"], list) else []
+            minutes = sum(
+                (clock_minutes(p["to"]) if p.get("to") else match_end) - clock_minutes(p["from"])
+                for p in positions if p.get("from")
+            )
+            if positions:
+                rows.append({"team": team, "player": player["player_name"], "minutes": max(minutes, 0.0)})
+    return pd.DataFrame(rows, columns=["team", "player", "minutes"])
+
+def substitutions_table(events: pd.DataFrame) -> pd.DataFrame:
+    subs = events[events["type"] == "Substitution"]
+    return pd.DataFrame({
+        "period": subs["period"], "minute": subs["minute"], "second": subs["second"], "team": subs["team"],
+        "player_off": subs["player"], "player_on": column(subs, "substitution_replacement"),
+        "reason": column(subs, "substitution_outcome"),
+    }).sort_values(["period", "minute", "second"]).reset_index(drop=True)
+
+def timeline_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Goals, own goals and cards, in match order
+    """
+    is_goal = (events["type"] == "Shot") & (column(events, "shot_outcome") == "Goal")
+    is_own_goal = events["type"] == "Own Goal Against"
+    card = card_column(events)
+    kind = pd.Series(None, index=events.index, dtype=object)
+    kind[card.notna()] = card[card.notna()]
+    kind[is_own_goal] = "Own Goal"
+    kind[is_goal] = "Goal"
+    rows = events[kind.notna()]
+    return pd.DataFrame({
+        "period": rows["period"], "minute": rows["minute"], "second": rows["second"],
+        "team": rows["team"], "player": rows["player"], "kind": kind[kind.notna()],
+        "xg": pd.to_numeric(column(rows, "shot_statsbomb_xg")),
+    }).sort_values(["period", "minute", "second"]).reset_index(drop=True)
+
+def event_index_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    The position of every event in the raw events frame, in minute order
+    """
+    index = pd.DataFrame({
+        "row": range(len(events)), "id": events["id"].values, "period": events["period"].values,
+        "minute": events["minute"].values, "second": events["second"].values,
+        "type": events["type"].values, "team": events["team"].values, "player": events["player"].values,
+    })
+    return index.sort_values("minute", kind="stable").reset_index(drop=True)
+
+def build_tables(events: pd.DataFrame, lineups: dict) -> dict[str, pd.DataFrame]:
+    """
+    Compute every derived table of a match, without touching the store
+    """
+    return {
+        "player_stats": compute_player_stats_table(events).rename_axis("player").reset_index(),
+        "player_minutes": player_minutes_table(lineups, events),
+        "team_totals": compute_team_totals(events).rename_axis("team").reset_index(),
+        "starting_xi": starting_xi_table(lineups),
+        "substitutions": substitutions_table(events),
+        "timeline": timeline_table(events),
+        "event_index": event_index_table(events),
+        **spatial_tables(events),
+    }
+
+def store_tables(match_id: int, tables: dict[str, pd.DataFrame]):
+    store = get_store()
+    for name, table in tables.items():
+        store.put(table_kind(name), match_id, table)
+
+def materialize(match_id: int, events: pd.DataFrame, lineups: dict) -> dict[str, pd.DataFrame]:
+    """
+    Compute and store every derived table of a match; its compact events,
+    built from the events on first use, are dropped
+    """
+    tables = build_tables(events, lineups)
+    store_tables(match_id, tables)
+    remove_compact(match_id)
+    return tables
+
+def ingest_match(match_id: int) -> dict:
+    """
+    Fetch (through the store) the events and lineups of a match and materialize its derived tables
+    """
+    return materialize(match_id, load_events(match_id), load_lineups(match_id))
+
+def get_table(match_id: int, name: str) -> pd.DataFrame:
+    """
+    Get a derived table of a match, ingesting the match when the table is not stored yet
+    """
+    table = get_store().get(table_kind(name), match_id)
+    if table is not None:
+        return table
+    with _ingest_locks_lock:
+        lock = _ingest_locks.setdefault(int(match_id), threading.Lock())
+    with lock:
+        # the match may have been ingested while we waited for the lock
+        table = get_store().get(table_kind(name), match_id)
+        if table is None:
+            table = ingest_match(match_id)[name]
+    return table
@@ -0,0 +1,255 @@
+from soccer_stats.stats import compute_player_stats_table, compute_team_totals
+from soccer_stats.store import CACHE_DIR, get_store, save_events
+from soccer_stats.ingest import ingest_match
+from soccer_stats import open_data
+from metrics import span
+import pandas as pd
+import threading
+import argparse
+import json
+import time
+import os
+
+# one file per live match, <match_id>.jsonl, with one raw StatsBomb event (JSON) per line
+LIVE_FEED_DIR = os.getenv("LIVE_FEED_DIR", os.path.join(CACHE_DIR, "live", "feeds"))
+STATE_COLUMNS = ["segment", "last_index", "rows", "ingested_at", "offset"]
+
+def feed_path(match_id: int) -> str:
+    return os.path.join(LIVE_FEED_DIR, f"{int(match_id)}.jsonl")
+
+def segments_kind(match_id: int) -> str:
+    return f"live/events/{int(match_id)}"
+
+def add_totals(totals: pd.DataFrame | None, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Running totals plus the totals of new events, every column being a sum
+    """
+    if totals is None:
+        return delta
+    added = totals.add(delta, fill_value=0)
+    return added.astype({col: int for col in added.columns if col != "xg"})
+
+class LiveMatch:
+    """
+    Incremental ingestion of a match still being played.
+
+    New lines of the match feed are parsed and stored as a segment of events,
+    and the player stats and team totals are updated with the counts of those
+    events only, so a poll costs in proportion to the new events. The feed is
+    the source of truth: the segments, the totals and the feed offset are
+    checkpointed in the match store, and a process whose checkpoint is missing
+    or behind reads the feed again from there.
+    """
+    def __init__(self, match_id: int):
+        self.match_id = int(match_id)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.state = pd.DataFrame(columns=STATE_COLUMNS)
+        self.segments = {}
+        self.player_stats = None
+        self.team_totals = None
+
+    @property
+    def last_index(self) -> int:
+        return int(self.state["last_index"].iloc[-1]) if len(self.state) else 0
+
+    def _checkpoint(self) -> pd.DataFrame | None:
+        return get_store().get("live/state", self.match_id)
+
+    def _load(self, state: pd.DataFrame):
+        """
+        Continue from the checkpoint of another process (or of a previous run)
+        """
+        store = get_store()
+        segments = {int(s): store.get(segments_kind(self.match_id), int(s)) for s in state["segment"]}
+        player_stats = store.get("live/player_stats", self.match_id)
+        team_totals = store.get("live/team_totals", self.match_id)
+        if any(segment is None for segment in segments.values()) or player_stats is None or team_totals is None:
+            # evicted from the store: start over from the feed
+            self.reset()
+            return
+        self.state = state
+        self.offset = int(state["offset"].iloc[-1])
+        self.segments = segments
+        self.player_stats = player_stats.set_index("player")
+        self.team_totals = team_totals.set_index("team")
+
+    def _read_feed(self) -> tuple[list, int]:
+        """
+        The complete lines added to the feed since the last poll, and the offset after them
+        """
+        path = feed_path(self.match_id)
+        if not os.path.exists(path):
+            return [], self.offset
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        # a line still being written is read on the next poll
+        end = data.rfind(b"\n") + 1
+        raw = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return raw, self.offset + end
+
+    def poll(self) -> int:
+        """
+        Ingest the events added to the feed since the last poll, returning how many there were
+        """
+        with self.lock:
+            checkpoint = self._checkpoint()
+            if checkpoint is not None and len(checkpoint) and int(checkpoint["offset"].iloc[-1]) > self.offset:
+                self._load(checkpoint)
+            raw, offset = self._read_feed()
+            # the feed may repeat events already ingested, e.g. after a restart of the source
+            raw = [event for event in raw if event["index"] > self.last_index]
+            if not raw:
+                self.offset = offset
+                return 0
+            with span("live_ingest"):
+                events = open_data.events_frame(raw, self.match_id).sort_values("index").reset_index(drop=True)
+                self.player_stats = add_totals(self.player_stats, compute_player_stats_table(events))
+                self.team_totals = add_totals(self.team_totals, compute_team_totals(events))
+                segment = int(events["index"].iloc[0])
+                self.segments[segment] = events
+                self.state = pd.DataFrame(self.state.to_dict(orient="records") + [{
+                    "segment": segment, "last_index": int(events["index"].iloc[-1]), "rows": len(events),
+                    "ingested_at": time.time(), "offset": offset,
+                }], columns=STATE_COLUMNS)
+                self.offset = offset
+                store = get_store()
+                store.put(segments_kind(self.match_id), segment, events)
+                store.put("live/player_stats", self.match_id, self.player_stats.rename_axis("player").reset_index())
+                store.put("live/team_totals", self.match_id, self.team_totals.rename_axis("team").reset_index())
+                store.put("live/state", self.match_id, self.state)
+            return len(events)
+
+    def delta(self, after_index: int = 0, since: float | None = None) -> dict:
+        """
+        The events ingested after an event index, or after a time (seconds since
+        the epoch), with the updated stats of the players involved and the team totals
+        """
+        with self.lock:
+            state = self.state
+            if since is not None:
+                state = state[state["ingested_at"] > since]
+            state = state[state["last_index"] > after_index]
+            frames = [self.segments[int(segment)] for segment in state["segment"]]
+            events = pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame(columns=["index"])
+            events = events[events["index"] > after_index]
+            players = events["player"].dropna().unique() if "player" in events else []
+            return {**self._totals(players), "events": events}
+
+    def _totals(self, players=None) -> dict:
+        player_stats = self.player_stats if self.player_stats is not None else pd.DataFrame()
+        if players is not None:
+            player_stats = player_stats.loc[player_stats.index.intersection(players)]
+        return {
+            "match_id": self.match_id,
+            "last_index": self.last_index,
+            "ingested_at": float(self.state["ingested_at"].iloc[-1]) if len(self.state) else None,
+            "player_stats": player_stats.rename_axis("player").reset_index(),
+            "team_totals": (self.team_totals if self.team_totals is not None else pd.DataFrame())
+                .rename_axis("team").reset_index(),
+        }
+
+    def totals(self) -> dict:
+        """
+        The player stats and team totals so far
+        """
+        with self.lock:
+            return self._totals()
+
+    def events(self) -> pd.DataFrame:
+        with self.lock:
+            frames = [self.segments[int(segment)] for segment in self.state["segment"]]
+        return pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame()
+
+    def finish(self) -> int:
+        """
+        Store the whole match as a finished one, so the rest of the app
+        (events, derived tables, season stats) reads it as usual
+        """
+        self.poll()
+        events = self.events()
+        save_events(self.match_id, events)
+        ingest_match(self.match_id)
+        return len(events)
+
+_live_matches = {}
+_live_lock = threading.Lock()
+
+def get_live_match(match_id: int) -> LiveMatch:
+    """
+    Get the process wide ingestion state of a live match
+    """
+    with _live_lock:
+        if int(match_id) not in _live_matches:
+            _live_matches[int(match_id)] = LiveMatch(match_id)
+        return _live_matches[int(match_id)]
+
+def raw_events(match_id: int) -> list:
+    """
+    The raw events of a finished match, from the open-data checkout (offline mode) or the StatsBomb API
+    """
+    if open_data.is_offline():
+        return open_data.read_json("events", f"{int(match_id)}.json")
+    from statsbombpy import sb
+    return list(sb.events(match_id=match_id, fmt="dict").values())
+
+def replay(match_id: int, speed: float = 60.0, batch_seconds: float = 1.0, progress=print):
+    """
+    Local stand-in for a live source: write the events of a finished match to
+    its feed at `speed` times the match clock, one batch every `batch_seconds`
+    """
+    events = sorted(raw_events(match_id), key=lambda event: event["index"])
+    path = feed_path(match_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+    start = time.monotonic()
+    written = 0
+    while written < len(events):
+        match_seconds = (time.monotonic() - start) * speed
+        due = written
+        while due < len(events) and events[due]["minute"] * 60 + events[due]["second"] <= match_seconds:
+            due += 1
+        if due > written:
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(event) + "\n" for event in events[written:due])
+            written = due
+            progress(f"{written}/{len(events)} events, minute {events[written - 1]['minute']}")
+        time.sleep(batch_seconds)
+
+def follow(match_id: int, interval: float = 2.0, progress=print):
+    """
+    Poll the feed of a match every `interval` seconds
+    """
+    live_match = get_live_match(match_id)
+    while True:
+        new_events = live_match.poll()
+        if new_events:
+            progress(f"{new_events} new events, last index {live_match.last_index}")
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Live ingestion of a match from its feed")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay_parser = subparsers.add_parser("replay", help="write the events of a finished match to its feed, as if live")
+    replay_parser.add_argument("match_id", type=int)
+    replay_parser.add_argument("--speed", type=float, default=60.0, help="match seconds per second")
+    replay_parser.add_argument("--batch-seconds", type=float, default=1.0)
+    follow_parser = subparsers.add_parser("follow", help="ingest the feed of a match as it grows")
+    follow_parser.add_argument("match_id", type=int)
+    follow_parser.add_argument("--interval", type=float, default=2.0)
+    finish_parser = subparsers.add_parser("finish", help="store the ingested match as a finished one")
+    finish_parser.add_argument("match_id", type=int)
+    args = parser.parse_args()
+    if args.command == "replay":
+        replay(args.match_id, args.speed, args.batch_seconds)
+    elif args.command == "follow":
+        follow(args.match_id, args.interval)
+    else:
+        print(json.dumps({"match_id": args.match_id, "events": get_live_match(args.match_id).finish()}))
+
+if __name__ == "__main__":
+    main()
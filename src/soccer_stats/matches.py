@@ -1,7 +1,12 @@
-from statsbombpy import sb
-from copy import copy
-import numpy as np
+from soccer_stats.store import get_store, load_lineups
+from soccer_stats.compact import load_compact
+from soccer_stats.models import LineupPlayer, PlayerStats
+from soccer_stats.ingest import get_table, table_kind
+from soccer_stats.spatial import heatmap, pass_matrix
+from metrics import timed
+from functools import lru_cache
 import pandas as pd
+import numpy as np
 import json
 import yaml
 
@@ -10,66 +15,125 @@ class PlayerStatsError(Exception):
         super().__init__(message)
         self.message = message
 
+@timed("serialize", step="json")
 def to_json(df: pd.DataFrame) -> str:
     """
     Convert the statsbombpy DataFrame to a JSON string
     """
     return json.dumps(df, indent=2)
 
+def load_match_lineups(match_id: int) -> dict[str, list[LineupPlayer]]:
+    """
+    Get the lineups for a given match as a dict of team name -> players
+    """
+    return {
+        team: [LineupPlayer.from_dict(player) for player in df.to_dict(orient='records')]
+        for team, df in load_lineups(match_id).items()
+    }
+
+def load_starting_11(match_id: int) -> dict[str, list[dict]]:
+    """
+    Get the starting eleven of each team, sorted by jersey number
+    """
+    starting_xi = get_table(match_id, "starting_xi")
+    return {
+        team: df.drop(columns="team").to_dict(orient='records')
+        for team, df in starting_xi.groupby("team", sort=False)
+    }
+
 def get_lineups(match_id: int) -> str:
     """
     Get the lineups for a given match
     """
-    data = sb.lineups(match_id=match_id)
-    data_final = copy(data)
-    list_fields = ['cards', 'positions']
-    for field in list_fields:
-        for key, df in data.items():
-            df[field] = df[field].apply(lambda v: {field: v})
-            data_final[key] = df.to_dict(orient='records')
-    return to_json(data_final)
+    return to_json({
+        team: [player.to_dict() for player in players]
+        for team, players in load_match_lineups(match_id).items()
+    })
+
+@timed("serialize", step="events_yaml")
+def events_to_yaml(events: list[dict]) -> str:
+    """
+    Dump the events of a match, already without empty attributes, to YAML
+    """
+    return yaml.dump(events)
 
 def get_events(match_id: int) -> str:
     """
-    Get the events for a given match
+    Get the events for a given match, in minute order, decoded from the
+    memory-mapped compact events
     """
-    events = sb.events(match_id=match_id, split=True, flatten_attrs=False)
-    full_events = pd.concat([v for _, v in events.items()])
-    return yaml.dump([
-        {k: v for k, v in event.items() if v is not np.nan} 
-        for event in full_events.sort_values(by="minute").to_dict(orient='records')
-    ])
+    order = get_table(match_id, "event_index")["row"]
+    return events_to_yaml(load_compact(match_id).records_at(order.values))
 
-def get_player_stats(match_id, player_name) -> str:
+@lru_cache(maxsize=32)
+def player_stats_table(match_id: int, version: tuple) -> pd.DataFrame:
+    """
+    The stats table of a match as stored at `version` (mtime and size of its
+    file), so a table rewritten by any process is read again
+    """
+    table = get_table(match_id, "player_stats")
+    if table.empty:
+        raise PlayerStatsError(f"No events found for match {match_id}")
+    return table.set_index("player")
+
+def get_player_stats_table(match_id: int) -> pd.DataFrame:
+    """
+    Get the stats table of every player in a match, indexed by player name
+    """
+    version = get_store().version(table_kind("player_stats"), match_id)
+    if version is None:
+        # not stored yet (or evicted): ingest the match, then cache the stored version
+        get_table(match_id, "player_stats")
+        version = get_store().version(table_kind("player_stats"), match_id)
+    if version is None:
+        return player_stats_table.__wrapped__(int(match_id), version)
+    return player_stats_table(int(match_id), version)
+
+def load_player_stats(match_id, player_name) -> PlayerStats:
     """
     Get the statistics for a given player in a match
     """
     try:
-        events = sb.events(match_id=match_id)
-        if events.empty:
-            raise PlayerStatsError(f"No events found for match {match_id}")
-        
-        player_events = events[events['player'] == player_name]
-        if player_events.empty:
+        table = get_player_stats_table(int(match_id))
+        if player_name not in table.index:
             raise PlayerStatsError(f"No events found for player {player_name} in match {match_id}")
-        
-        stats = {
-            "player": player_name,
-            "passes_completed": player_events[(player_events['type'] == 'Pass') & (player_events['pass_outcome'].isna())].shape[0],
-            "passes_attempted": player_events[player_events['type'] == 'Pass'].shape[0],
-            "shots": player_events[player_events['type'] == 'Shot'].shape[0],
-            "shots_on_target": player_events[(player_events['type'] == 'Shot') & (player_events['shot_outcome'] == 'On Target')].shape[0],
-            "fouls_committed": player_events[player_events['type'] == 'Foul Committed'].shape[0],
-            "fouls_won": player_events[player_events['type'] == 'Foul Won'].shape[0],
-            "tackles": player_events[player_events['type'] == 'Tackle'].shape[0],
-            "interceptions": player_events[player_events['type'] == 'Interception'].shape[0],
-            "dribbles_successful": player_events[(player_events['type'] == 'Dribble') & (player_events['dribble_outcome'] == 'Complete')].shape[0],
-            "dribbles_attempted": player_events[player_events['type'] == 'Dribble'].shape[0],
-        }
+
+        return PlayerStats(player=player_name, **{k: int(v) for k, v in table.loc[player_name].items()})
 
     except PlayerStatsError as e:
         raise PlayerStatsError(e.message)
     except Exception as e:
         raise PlayerStatsError(f"An unexpected error occurred: {str(e)}")
-    
-    return to_json(stats)
\ No newline at end of file
+
+def get_player_stats(match_id, player_name) -> str:
+    """
+    Get the statistics for a given player in a match as a JSON string
+    """
+    return to_json(load_player_stats(match_id, player_name).to_dict())
+
+def load_heatmap(match_id: int, team: str | None = None, player: str | None = None,
+                 types: list[str] | None = None) -> np.ndarray:
+    """
+    Get the heatmap grid of a team or a player in a match, optionally for some event types only
+    """
+    return heatmap(get_table(match_id, "heatmap"), team, player, types)
+
+def load_pass_network(match_id: int, team: str, min_passes: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    Get the pass network of a team in a match: the average position of each
+    player (nodes), the passes between teammates (edges) and the adjacency matrix
+    """
+    edges = get_table(match_id, "pass_network")
+    nodes = get_table(match_id, "average_positions")
+    edges = edges[edges["team"] == team]
+    return {
+        "nodes": nodes[nodes["team"] == team].drop(columns="team").reset_index(drop=True),
+        "edges": edges[edges["passes"] >= min_passes].drop(columns="team").reset_index(drop=True),
+        "matrix": pass_matrix(edges, team),
+    }
+
+def load_xg_timeline(match_id: int) -> pd.DataFrame:
+    """
+    Get every shot of a match in order, with the running xG of each team
+    """
+    return get_table(match_id, "xg_timeline")
@@ -0,0 +1,109 @@
+from dataclasses import dataclass, asdict
+
+@dataclass(slots=True, frozen=True)
+class Position:
+    """
+    A position played by a player during a match
+    """
+    position_id: int
+    position: str
+    from_time: str | None = None
+    to_time: str | None = None
+    from_period: int | None = None
+    to_period: int | None = None
+    start_reason: str | None = None
+    end_reason: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Position":
+        return cls(
+            position_id=data.get("position_id"),
+            position=data.get("position"),
+            from_time=data.get("from"),
+            to_time=data.get("to"),
+            from_period=data.get("from_period"),
+            to_period=data.get("to_period"),
+            start_reason=data.get("start_reason"),
+            end_reason=data.get("end_reason"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "position_id": self.position_id,
+            "position": self.position,
+            "from": self.from_time,
+            "to": self.to_time,
+            "from_period": self.from_period,
+            "to_period": self.to_period,
+            "start_reason": self.start_reason,
+            "end_reason": self.end_reason,
+        }
+
+@dataclass(slots=True, frozen=True)
+class LineupPlayer:
+    """
+    A player listed in the lineup of a team
+    """
+    player_id: int
+    player_name: str
+    player_nickname: str | None
+    jersey_number: int
+    country: str
+    cards: tuple = ()
+    positions: tuple[Position, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LineupPlayer":
+        return cls(
+            player_id=data["player_id"],
+            player_name=data["player_name"],
+            player_nickname=data.get("player_nickname"),
+            jersey_number=data["jersey_number"],
+            country=data.get("country"),
+            cards=tuple(data.get("cards") or ()),
+            positions=tuple(Position.from_dict(p) for p in data.get("positions") or ()),
+        )
+
+    @property
+    def is_starter(self) -> bool:
+        return bool(self.positions) and self.positions[0].start_reason == "Starting XI"
+
+    def to_dict(self) -> dict:
+        """
+        JSON compatible dict, in the format returned by `get_lineups`
+        """
+        return {
+            "player_id": self.player_id,
+            "player_name": self.player_name,
+            "player_nickname": self.player_nickname,
+            "jersey_number": self.jersey_number,
+            "country": self.country,
+            "cards": {"cards": list(self.cards)},
+            "positions": {"positions": [p.to_dict() for p in self.positions]},
+        }
+
+@dataclass(slots=True, frozen=True)
+class PlayerStats:
+    """
+    The counting stats of a player in a match
+    """
+    player: str
+    passes_completed: int = 0
+    passes_attempted: int = 0
+    shots: int = 0
+    shots_on_target: int = 0
+    fouls_committed: int = 0
+    fouls_won: int = 0
+    tackles: int = 0
+    interceptions: int = 0
+    dribbles_successful: int = 0
+    dribbles_attempted: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def counts(self) -> dict:
+        """
+        The stats without the player name
+        """
+        return {k: v for k, v in asdict(self).items() if k != "player"}
@@ -0,0 +1,96 @@
+from statsbombpy import entities
+from statsbombpy.helpers import filter_and_group_events
+import pandas as pd
+import json
+import os
+
+OPEN_DATA_DIR = os.getenv("STATSBOMB_OPEN_DATA_DIR")
+
+def is_offline() -> bool:
+    """
+    Whether the data should be served from a local StatsBomb open-data checkout
+    """
+    return bool(OPEN_DATA_DIR)
+
+def read_json(*parts: str):
+    """
+    Read a JSON file from the `data` folder of the local open-data checkout
+    """
+    path = os.path.join(OPEN_DATA_DIR, "data", *parts)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def competitions_frame(raw: list) -> pd.DataFrame:
+    """
+    Build the same frame as `sb.competitions()` from the raw open-data JSON
+    """
+    return pd.DataFrame(raw)
+
+def matches_frame(raw: list) -> pd.DataFrame:
+    """
+    Build the same frame as `sb.matches(competition_id, season_id)` from the raw open-data JSON
+    """
+    raw = entities.matches(raw)
+    managers = {
+        side: [", ".join(m["name"] for m in match[side].get("managers", [])) for match in raw.values()]
+        for side in ["home_team", "away_team"]
+    }
+    matches = pd.DataFrame(raw.values())
+    matches["competition"] = matches.competition.apply(
+        lambda c: f"{c['country_name']} - {c['competition_name']}"
+    )
+    for col in ["season", "home_team", "away_team"]:
+        matches[col] = matches[col].apply(lambda c: c[f"{col}_name"])
+    for col in ["competition_stage", "stadium", "referee"]:
+        if col in matches.columns:
+            matches[col] = matches[col].apply(lambda x: x["name"] if isinstance(x, dict) else x)
+    matches["home_managers"] = managers["home_team"]
+    matches["away_managers"] = managers["away_team"]
+    metadata = matches.pop("metadata")
+    for k in ["data_version", "shot_fidelity_version", "xy_fidelity_version"]:
+        matches[k] = metadata.apply(lambda x: x.get(k) if isinstance(x, dict) else None)
+    return matches
+
+def lineups_frames(raw: list) -> dict:
+    """
+    Build the same dict of frames as `sb.lineups(match_id)` from the raw open-data JSON
+    """
+    lineups = {}
+    for lineup in raw:
+        lineup_df = pd.DataFrame(lineup["lineup"])
+        lineup_df["country"] = lineup_df.country.apply(
+            lambda c: c["name"] if isinstance(c, dict) else "Unknown"
+        )
+        lineups[lineup["team_name"]] = lineup_df
+    return lineups
+
+def events_frame(raw: list, match_id: int) -> pd.DataFrame:
+    """
+    Build the same frame as `sb.events(match_id)` from the raw open-data JSON
+    """
+    grouped = filter_and_group_events(entities.events(raw, match_id), {}, "dataframe", True)
+    return pd.concat([pd.DataFrame(evs) for evs in grouped.values()], axis=0, ignore_index=True, sort=True)
+
+def competitions() -> pd.DataFrame:
+    """
+    Same frame as `sb.competitions()`, read from the local checkout
+    """
+    return competitions_frame(read_json("competitions.json"))
+
+def matches(competition_id: int, season_id: int) -> pd.DataFrame:
+    """
+    Same frame as `sb.matches(competition_id, season_id)`, read from the local checkout
+    """
+    return matches_frame(read_json("matches", str(competition_id), f"{season_id}.json"))
+
+def lineups(match_id: int) -> dict:
+    """
+    Same dict of frames as `sb.lineups(match_id)`, read from the local checkout
+    """
+    return lineups_frames(read_json("lineups", f"{match_id}.json"))
+
+def events(match_id: int) -> pd.DataFrame:
+    """
+    Same frame as `sb.events(match_id)`, read from the local checkout
+    """
+    return events_frame(read_json("events", f"{match_id}.json"), match_id)
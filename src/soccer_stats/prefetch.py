@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from soccer_stats.competitions import load_matches
+from soccer_stats.ingest import materialize
+from soccer_stats import store
+import argparse
+import json
+import time
+
+def fetch_match(match_id: int) -> tuple[int, dict, object]:
+    """
+    Fetch the lineups and events of a match without touching the store,
+    so it can run in a worker process
+    """
+    return match_id, store.fetch_lineups(match_id), store.fetch_events(match_id)
+
+def prefetch_season(competition_id: int, season_id: int, workers: int = 8,
+                    processes: bool = False, force: bool = False, progress=print) -> dict:
+    """
+    Fetch the lineups and events of every match of a season into the local store,
+    with their derived tables
+
+    Args:
+        competition_id (int): The competition to warm up.
+        season_id (int): The season to warm up.
+        workers (int): How many matches are fetched in parallel.
+        processes (bool): Use a process pool instead of a thread pool, so the
+            event parsing runs on several cores.
+        force (bool): Fetch again the matches that are already stored.
+        progress (callable): Called with a progress line after each match.
+    """
+    match_ids = [int(match_id) for match_id in load_matches(competition_id, season_id)["match_id"]]
+    if not force:
+        # only the manifest is read, the stored files are not decoded
+        match_store = store.get_store()
+        match_ids = [
+            match_id for match_id in match_ids
+            if match_store.entry("events", match_id) is None or match_store.entry("lineups", match_id) is None
+        ]
+
+    summary = {"competition_id": competition_id, "season_id": season_id,
+               "matches": len(match_ids), "done": 0, "failed": [], "events": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_cls(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_match, match_id): match_id for match_id in match_ids}
+        for future in as_completed(futures):
+            match_id = futures[future]
+            try:
+                _, lineups, events = future.result()
+                store.save_lineups(match_id, lineups)
+                events = store.save_events(match_id, events)
+                materialize(match_id, events, lineups)
+                summary["events"] += len(events)
+                summary["done"] += 1
+                status = f"{len(events)} events"
+            except Exception as e:
+                summary["failed"].append(match_id)
+                status = f"failed ({e})"
+            summary["seconds"] = time.perf_counter() - start
+            progress(
+                f"[{summary['done'] + len(summary['failed'])}/{summary['matches']}] match {match_id}: {status} "
+                f"({summary['done'] / summary['seconds']:.2f} matches/s, {summary['events'] / summary['seconds']:.0f} events/s)"
+            )
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the local match store with a whole season")
+    parser.add_argument("competition_id", type=int)
+    parser.add_argument("season_id", type=int)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    parser.add_argument("--force", action="store_true", help="fetch again matches already in the store")
+    args = parser.parse_args()
+    summary = prefetch_season(args.competition_id, args.season_id, workers=args.workers,
+                              processes=args.processes, force=args.force)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from soccer_stats.store import get_store
+from metrics import span, timed
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pyarrow as pa
+import pandas as pd
+import json
+import os
+
+@dataclass(slots=True, frozen=True)
+class EventFilter:
+    """
+    Predicates of an event query; every field left as None matches everything.
+    `after_index` keeps the events after a given event index, for pagination.
+    `match_ids` selects the files to read, the other fields are pushed down to
+    the Parquet reader, which skips the row groups that cannot match.
+    """
+    match_ids: tuple[int, ...] | None = None
+    types: tuple[str, ...] | None = None
+    players: tuple[str, ...] | None = None
+    teams: tuple[str, ...] | None = None
+    periods: tuple[int, ...] | None = None
+    minute_min: int | None = None
+    minute_max: int | None = None
+    after_index: int | None = None
+
+    # field -> event column, for the fields matching a set of values
+    IN_COLUMNS = {"types": "type", "players": "player", "teams": "team", "periods": "period"}
+
+    def expression(self, schema: pa.Schema) -> ds.Expression | None:
+        """
+        The predicates as a pyarrow expression, or None when there is nothing to filter
+        """
+        predicates = []
+        for name, col in self.IN_COLUMNS.items():
+            values = getattr(self, name)
+            if values is not None:
+                matchable = values and col in schema.names
+                predicates.append(ds.field(col).isin(list(values)) if matchable else ds.scalar(False))
+        if self.minute_min is not None:
+            predicates.append(ds.field("minute") >= self.minute_min)
+        if self.minute_max is not None:
+            predicates.append(ds.field("minute") <= self.minute_max)
+        if self.after_index is not None:
+            predicates.append(ds.field("index") > self.after_index)
+        if not predicates:
+            return None
+        expression = predicates[0]
+        for predicate in predicates[1:]:
+            expression &= predicate
+        return expression
+
+    def where_sql(self) -> tuple[str, list]:
+        """
+        The predicates as a SQL WHERE clause with its parameters, for DuckDB
+        """
+        clauses, params = [], []
+        for name, col in self.IN_COLUMNS.items():
+            values = getattr(self, name)
+            if values is not None:
+                clauses.append(f'"{col}" IN ({", ".join("?" for _ in values)})' if values else "FALSE")
+                params.extend(values)
+        if self.minute_min is not None:
+            clauses.append('"minute" >= ?')
+            params.append(self.minute_min)
+        if self.minute_max is not None:
+            clauses.append('"minute" <= ?')
+            params.append(self.minute_max)
+        if self.after_index is not None:
+            clauses.append('"index" > ?')
+            params.append(self.after_index)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    @classmethod
+    def from_params(cls, **params) -> "EventFilter":
+        """
+        Build a filter from single values or lists, ignoring empty ones
+        """
+        values = {}
+        for f in fields(cls):
+            value = params.get(f.name)
+            if value is None or value == []:
+                continue
+            if f.name in ("minute_min", "minute_max", "after_index"):
+                values[f.name] = value
+            else:
+                values[f.name] = tuple(value) if isinstance(value, (list, tuple, set)) else (value,)
+        return cls(**values)
+
+@lru_cache(maxsize=4096)
+def file_schema(path: str, mtime: float) -> pa.Schema:
+    """
+    Schema of a Parquet file, read from its footer only
+    """
+    return pq.read_schema(path)
+
+def event_files(match_ids: tuple[int, ...] | None = None) -> dict[int, str]:
+    """
+    Paths of the stored event files, for the given matches or every stored match
+    """
+    store = get_store()
+    if match_ids is None:
+        match_ids = store.match_ids("events")
+    paths = {match_id: store.path("events", match_id) for match_id in match_ids}
+    return {match_id: path for match_id, path in paths.items() if os.path.exists(path)}
+
+def events_schema(paths: list[str]) -> pa.Schema:
+    """
+    Union of the schemas of the event files, matches do not all have the same columns
+    """
+    return pa.unify_schemas(
+        [file_schema(path, os.path.getmtime(path)) for path in paths], promote_options="permissive"
+    )
+
+def decode_columns(df: pd.DataFrame, files: dict[int, str]) -> pd.DataFrame:
+    """
+    Decode the JSON encoded columns of the result, as the store does on read.
+    A column is encoded per file: when it holds plain strings in some of the
+    files, only the rows of the matches where it is encoded are decoded.
+    """
+    store = get_store()
+    json_columns = {}
+    for match_id in files:
+        entry = store.entry("events", match_id)
+        json_columns[match_id] = set(entry["json_columns"]) if entry is not None else set()
+    decode = lambda v: json.loads(v) if isinstance(v, str) else None
+    for col in df.columns:
+        having = [match_id for match_id, path in files.items()
+                  if col in file_schema(path, os.path.getmtime(path)).names]
+        encoded = [match_id for match_id in having if col in json_columns[match_id]]
+        if not encoded:
+            continue
+        if len(encoded) == len(having):
+            df[col] = df[col].map(decode)
+        elif "match_id" in df:
+            rows = df["match_id"].isin(encoded)
+            df[col] = df[col].astype(object)
+            df.loc[rows, col] = df.loc[rows, col].map(decode)
+    return df
+
+def query_events(event_filter: EventFilter = EventFilter(), columns: list[str] | None = None,
+                 limit: int | None = None, engine: str = "arrow", decode: bool = True) -> pd.DataFrame:
+    """
+    Query the events stored locally, reading only the requested columns and
+    the row groups that can match the filter
+
+    Args:
+        event_filter (EventFilter): The predicates on match, type, player, team, period and minute.
+        columns (list): The columns to return, every column by default. Unknown columns are ignored.
+        limit (int): Stop after this many events.
+        engine (str): "arrow" (pyarrow dataset) or "duckdb", when the duckdb package is installed.
+        decode (bool): Decode the nested columns (locations, tactics...), stored as JSON strings.
+    """
+    with span("query", engine=engine):
+        return run_query(event_filter, columns, limit, engine, decode)
+
+def run_query(event_filter: EventFilter, columns: list[str] | None, limit: int | None,
+              engine: str, decode: bool) -> pd.DataFrame:
+    files = event_files(event_filter.match_ids)
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+    paths = list(files.values())
+    schema = events_schema(paths)
+    if columns is not None:
+        columns = [col for col in columns if col in schema.names]
+    # the match of each row tells which columns are JSON encoded, see decode_columns
+    with_match_id = decode and columns is not None and "match_id" not in columns and "match_id" in schema.names
+    if with_match_id:
+        columns = [*columns, "match_id"]
+
+    if engine == "duckdb":
+        import duckdb
+        select = ", ".join(f'"{col}"' for col in columns) if columns else "*"
+        where, params = event_filter.where_sql()
+        sql = f"SELECT {select} FROM read_parquet(?, union_by_name = true) {where}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        df = duckdb.execute(sql, [paths, *params]).df()
+    else:
+        dataset = ds.dataset(paths, schema=schema, format="parquet")
+        scanner = dataset.scanner(columns=columns, filter=event_filter.expression(schema))
+        table = scanner.head(limit) if limit is not None else scanner.to_table()
+        df = table.to_pandas()
+    if decode:
+        df = decode_columns(df, files)
+    return df.drop(columns="match_id") if with_match_id else df
+
+@timed("serialize", step="records")
+def frame_records(df: pd.DataFrame) -> list[dict]:
+    """
+    JSON compatible rows of a query result
+    """
+    return json.loads(df.to_json(orient="records", default_handler=str))
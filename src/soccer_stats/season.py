@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from soccer_stats.competitions import load_matches
+from soccer_stats.ingest import build_tables, store_tables, table_kind
+from soccer_stats.stats import PLAYER_STATS
+from soccer_stats import store
+import multiprocessing
+import pandas as pd
+import threading
+import json
+import os
+
+SEASON_WORKERS = int(os.getenv("SEASON_WORKERS", str(os.cpu_count() or 1)))
+# season totals kept in memory, for this many (seasons) queries
+SEASON_CACHE_SIZE = 32
+
+# derived tables read for each match of a season
+SEASON_TABLES = ["player_stats", "player_minutes", "team_totals"]
+
+def match_tables(match_id: int) -> tuple[int, dict[str, pd.DataFrame], bool]:
+    """
+    Read the season tables of a match, computing them from its events when
+    they are not stored yet. Runs in a worker process: only the small derived
+    tables go back to the parent, which stores the new ones.
+    """
+    match_store = store.get_store()
+    tables = {name: match_store.read(table_kind(name), match_id) for name in SEASON_TABLES}
+    if all(table is not None for table in tables.values()):
+        return match_id, tables, False
+    events = match_store.read("events", match_id)
+    if events is None:
+        # same order as the file written later, the event index table points into it
+        events = store.in_event_order(store.fetch_events(match_id))
+    lineups = match_store.read("lineups", match_id)
+    if lineups is None:
+        lineups = store.fetch_lineups(match_id)
+    else:
+        lineups = {team: df for team, df in lineups.groupby("team", sort=False)}
+    return match_id, build_tables(events, lineups), True
+
+def match_player_rows(tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per (player, team) of a match: counting stats, minutes and a match played
+    """
+    team_of = tables["player_minutes"].drop_duplicates("player").set_index("player")["team"]
+    stats = tables["player_stats"].assign(team=lambda df: df["player"].map(team_of).fillna(""))
+    rows = stats.merge(tables["player_minutes"], on=["player", "team"], how="outer")
+    rows = rows.fillna({stat: 0 for stat in PLAYER_STATS} | {"minutes": 0.0})
+    return rows.assign(matches=1).set_index(["player", "team"])
+
+def match_team_rows(tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    return tables["team_totals"].assign(matches=1).set_index("team")
+
+def accumulate(totals: pd.DataFrame | None, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the rows of one match to the running totals
+    """
+    if totals is None:
+        return rows
+    return totals.add(rows, fill_value=0)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_season_pool(workers: int = SEASON_WORKERS) -> ProcessPoolExecutor:
+    """
+    Get the process pool scanning the matches of a season, started once per
+    process. Workers are spawned rather than forked, the API worker having
+    threads (and their locks) running.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def close_season_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+_season_cache = OrderedDict()
+_season_cache_lock = threading.Lock()
+
+def tables_versions(match_ids: tuple[int, ...]) -> tuple:
+    """
+    The version of every season table of the matches, None for the ones not stored
+    """
+    match_store = store.get_store()
+    return tuple(match_store.version(table_kind(name), match_id) for match_id in match_ids for name in SEASON_TABLES)
+
+def fold_matches(match_ids: tuple[int, ...]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Matches are processed one at a time by the process pool and folded into
+    running totals, so memory grows with the number of players and teams,
+    not with the number of events.
+    """
+    players = teams = None
+    for match_id, tables, computed in get_season_pool().map(match_tables, match_ids, chunksize=4):
+        if computed:
+            store_tables(match_id, tables)
+        players = accumulate(players, match_player_rows(tables))
+        teams = accumulate(teams, match_team_rows(tables))
+    if players is None:
+        return pd.DataFrame(), pd.DataFrame()
+    return players, teams
+
+def scan_seasons(seasons: list[tuple[int, int]]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Sum the per-player and per-team totals over every match of the given
+    (competition_id, season_id) pairs
+
+    The totals are kept in memory until one of the derived tables of those
+    matches is written again (a match materialized, prefetched or evicted).
+    """
+    match_ids = tuple(int(m) for c, s in seasons for m in load_matches(c, s)["match_id"])
+    versions = tables_versions(match_ids)
+    with _season_cache_lock:
+        cached = _season_cache.get(match_ids)
+        if cached is not None and cached[0] == versions:
+            _season_cache.move_to_end(match_ids)
+            return cached[1]
+    totals = fold_matches(match_ids)
+    # the missing tables were stored by the scan
+    versions = tables_versions(match_ids)
+    if None not in versions:
+        with _season_cache_lock:
+            _season_cache[match_ids] = (versions, totals)
+            _season_cache.move_to_end(match_ids)
+            while len(_season_cache) > SEASON_CACHE_SIZE:
+                _season_cache.popitem(last=False)
+    return totals
+
+def per_90(totals: pd.DataFrame, minutes: pd.Series) -> pd.DataFrame:
+    return totals.div(minutes.where(minutes > 0), axis=0).mul(90).round(2)
+
+def season_player_table(players: pd.DataFrame, min_minutes: float = 0) -> pd.DataFrame:
+    """
+    Season totals and per 90 minutes rates of every player
+    """
+    if players.empty:
+        return players
+    players = players[players["minutes"] >= min_minutes]
+    counts = list(PLAYER_STATS)
+    table = players[counts + ["matches"]].astype(int).assign(minutes=players["minutes"].round(1))
+    return table.join(per_90(players[counts], players["minutes"]).add_suffix("_per_90"))
+
+def season_team_table(teams: pd.DataFrame) -> pd.DataFrame:
+    """
+    Season totals and per match averages of every team
+    """
+    if teams.empty:
+        return teams
+    counts = [col for col in teams.columns if col != "matches"]
+    table = teams.astype({col: int for col in counts if col != "xg"}).astype({"matches": int})
+    return table.join(teams[counts].div(teams["matches"], axis=0).round(2).add_suffix("_per_match"))
+
+def load_season_players(competition_id: int, season_id: int, min_minutes: float = 0) -> pd.DataFrame:
+    return season_player_table(scan_seasons([(competition_id, season_id)])[0], min_minutes)
+
+def load_season_teams(competition_id: int, season_id: int) -> pd.DataFrame:
+    return season_team_table(scan_seasons([(competition_id, season_id)])[1])
+
+def table_records(table: pd.DataFrame) -> list[dict]:
+    """
+    JSON compatible rows of a season table, with the index as columns and NaN as None
+    """
+    return json.loads(table.reset_index().to_json(orient="records"))
@@ -0,0 +1,134 @@
+from soccer_stats.stats import column
+from soccer_stats.compact import LOCATION_COLUMNS, location_values
+import numpy as np
+import pandas as pd
+
+# StatsBomb pitch, in yards: x along the length (0 is the own goal line), y along the width
+PITCH_LENGTH = 120.0
+PITCH_WIDTH = 80.0
+# cells of the heatmaps along the length and the width, bump the derived tables version when changed
+HEATMAP_BINS = (12, 8)
+# events placing a player on the pitch for the pass network
+POSITION_TYPES = ["Pass", "Ball Receipt*"]
+# StatsBomb period of a penalty shootout
+SHOOTOUT_PERIOD = 5
+
+def with_locations(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    The events with the x, y columns of the compact frame, derived from the
+    nested locations of a statsbombpy frame when they are not there yet
+    """
+    missing = {col: location_values(events, names, axis)
+               for col, (names, axis) in LOCATION_COLUMNS.items() if col not in events}
+    return events.assign(**missing) if missing else events
+
+def pitch_cells(x: np.ndarray, y: np.ndarray, bins: tuple[int, int] = HEATMAP_BINS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The heatmap cell of each location, locations on or past the lines go to the border cells
+    """
+    x_bin = np.clip((x * (bins[0] / PITCH_LENGTH)).astype("i4"), 0, bins[0] - 1)
+    y_bin = np.clip((y * (bins[1] / PITCH_WIDTH)).astype("i4"), 0, bins[1] - 1)
+    return x_bin, y_bin
+
+def heatmap_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Events with a location counted per team, player, event type and cell of
+    the pitch, only the cells with events are kept
+    """
+    events = with_locations(events)
+    located = events[events["location_x"].notna() & events["player"].notna()]
+    x_bin, y_bin = pitch_cells(located["location_x"].to_numpy(dtype="f4"), located["location_y"].to_numpy(dtype="f4"))
+    cells = pd.DataFrame({
+        "team": located["team"].astype(object).values, "player": located["player"].astype(object).values,
+        "type": located["type"].astype(object).values, "x_bin": x_bin, "y_bin": y_bin,
+    })
+    return cells.groupby(list(cells.columns)).size().rename("count").reset_index()
+
+def heatmap(table: pd.DataFrame, team: str | None = None, player: str | None = None,
+            types: list[str] | None = None, bins: tuple[int, int] = HEATMAP_BINS) -> np.ndarray:
+    """
+    The counts of a heatmap table as a (width bins, length bins) grid, for a
+    team, a player and event types, or every event when not given
+    """
+    keep = np.ones(len(table), dtype=bool)
+    if team is not None:
+        keep &= (table["team"] == team).to_numpy()
+    if player is not None:
+        keep &= (table["player"] == player).to_numpy()
+    if types:
+        keep &= table["type"].isin(types).to_numpy()
+    cells = table[keep]
+    grid = np.bincount(cells["y_bin"].to_numpy() * bins[0] + cells["x_bin"].to_numpy(),
+                       weights=cells["count"].to_numpy(), minlength=bins[0] * bins[1])
+    return grid.reshape(bins[1], bins[0]).astype("i8")
+
+def completed_passes(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Passes that reached a teammate: StatsBomb only sets an outcome on the others
+    """
+    is_completed = (events["type"] == "Pass") & column(events, "pass_outcome").isna()
+    return events[is_completed & column(events, "pass_recipient").notna()]
+
+def pass_network_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Completed passes between every pair of teammates
+    """
+    passes = completed_passes(events)
+    edges = pd.DataFrame({
+        "team": passes["team"].astype(object).values, "player": passes["player"].astype(object).values,
+        "recipient": column(passes, "pass_recipient").astype(object).values,
+    })
+    return edges.groupby(list(edges.columns)).size().rename("passes").reset_index()
+
+def average_positions_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Average location of every player when passing or receiving the ball, the nodes of the pass network
+    """
+    events = with_locations(events)
+    touches = events[events["type"].isin(POSITION_TYPES) & events["location_x"].notna() & events["player"].notna()]
+    positions = pd.DataFrame({
+        "team": touches["team"].astype(object).values, "player": touches["player"].astype(object).values,
+        "x": touches["location_x"].to_numpy(dtype="f8"), "y": touches["location_y"].to_numpy(dtype="f8"),
+    })
+    grouped = positions.groupby(["team", "player"])
+    return grouped[["x", "y"]].mean().assign(touches=grouped.size()).reset_index()
+
+def pass_matrix(edges: pd.DataFrame, team: str) -> pd.DataFrame:
+    """
+    The adjacency matrix of the pass network of a team: passes from the
+    player of each row to the player of each column
+    """
+    edges = edges[edges["team"] == team]
+    players = sorted(set(edges["player"]) | set(edges["recipient"]))
+    passer = pd.Categorical(edges["player"], categories=players).codes
+    recipient = pd.Categorical(edges["recipient"], categories=players).codes
+    matrix = np.zeros((len(players), len(players)), dtype="i8")
+    np.add.at(matrix, (passer, recipient), edges["passes"].to_numpy())
+    return pd.DataFrame(matrix, index=pd.Index(players, name="player"), columns=players)
+
+def xg_timeline_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every shot in match order with its xG and the running xG of its team.
+    Penalty shootout kicks (and their goals) are left out, they are not part of the match.
+    """
+    shots = events[(events["type"] == "Shot") & (events["period"] != SHOOTOUT_PERIOD)]
+    timeline = pd.DataFrame({
+        "period": shots["period"].to_numpy(dtype="i8"), "minute": shots["minute"].to_numpy(dtype="i8"),
+        "second": shots["second"].to_numpy(dtype="i8"), "team": shots["team"].astype(object).values,
+        "player": shots["player"].astype(object).values,
+        "xg": pd.to_numeric(column(shots, "shot_statsbomb_xg")).fillna(0.0).to_numpy(dtype="f8"),
+        "goal": (column(shots, "shot_outcome") == "Goal").to_numpy(dtype=bool),
+    }).sort_values(["period", "minute", "second"], kind="stable").reset_index(drop=True)
+    return timeline.assign(cumulative_xg=timeline.groupby("team")["xg"].cumsum())
+
+def spatial_tables(events: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Every spatial table of a match, the locations being derived once
+    """
+    events = with_locations(events)
+    return {
+        "heatmap": heatmap_table(events),
+        "pass_network": pass_network_table(events),
+        "average_positions": average_positions_table(events),
+        "xg_timeline": xg_timeline_table(events),
+    }
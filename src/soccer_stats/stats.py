@@ -0,0 +1,80 @@
+import pandas as pd
+
+# shot outcomes counted as on target, by the player stats and the team totals
+ON_TARGET_OUTCOMES = ["Goal", "Saved", "Saved to Post"]
+
+# stat name -> (event type, outcome); an outcome of None counts every event of
+# the type, "" counts only events without an outcome (e.g. completed passes)
+# and a list counts the events with any of those outcomes
+PLAYER_STATS = {
+    "passes_completed": ("Pass", ""),
+    "passes_attempted": ("Pass", None),
+    "shots": ("Shot", None),
+    "shots_on_target": ("Shot", ON_TARGET_OUTCOMES),
+    "fouls_committed": ("Foul Committed", None),
+    "fouls_won": ("Foul Won", None),
+    "tackles": ("Tackle", None),
+    "interceptions": ("Interception", None),
+    "dribbles_successful": ("Dribble", "Complete"),
+    "dribbles_attempted": ("Dribble", None),
+}
+OUTCOME_COLUMNS = ["pass_outcome", "shot_outcome", "dribble_outcome"]
+
+def column(events: pd.DataFrame, name: str) -> pd.Series:
+    """
+    Get a column of the events, or an empty one when no event has the attribute
+    """
+    if name in events:
+        return events[name]
+    return pd.Series(None, index=events.index, dtype=object)
+
+def card_column(events: pd.DataFrame) -> pd.Series:
+    """
+    The card of each event, from a foul or from bad behaviour
+    """
+    return column(events, "foul_committed_card").astype(object).combine_first(column(events, "bad_behaviour_card").astype(object))
+
+def compute_player_stats_table(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the stats of every player in a match in a single groupby pass
+
+    Events are counted once per (player, type, outcome), then every stat in
+    PLAYER_STATS is derived from those counts.
+    """
+    outcome = column(events, OUTCOME_COLUMNS[0]).astype(object)
+    for name in OUTCOME_COLUMNS[1:]:
+        outcome = outcome.combine_first(column(events, name).astype(object))
+    outcome = outcome.fillna("")
+    counts = events.assign(outcome=outcome).groupby(["player", "type", "outcome"], observed=True).size()
+    players = counts.index.unique(level="player")
+    types = counts.index.get_level_values("type")
+    outcomes = counts.index.get_level_values("outcome")
+    table = pd.DataFrame(index=players)
+    for stat, (event_type, event_outcome) in PLAYER_STATS.items():
+        mask = types == event_type
+        if isinstance(event_outcome, list):
+            mask &= outcomes.isin(event_outcome)
+        elif event_outcome is not None:
+            mask &= outcomes == event_outcome
+        table[stat] = counts[mask].groupby(level="player", observed=True).sum().reindex(players, fill_value=0).astype(int)
+    return table
+
+def compute_team_totals(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the totals of each team in a match (or part of a match), indexed by team name
+    """
+    is_type = lambda event_type: events["type"] == event_type
+    shot_outcome = column(events, "shot_outcome")
+    card = card_column(events)
+    flags = pd.DataFrame({
+        "goals": (is_type("Shot") & (shot_outcome == "Goal")) | is_type("Own Goal For"),
+        "shots": is_type("Shot"),
+        "shots_on_target": is_type("Shot") & shot_outcome.isin(ON_TARGET_OUTCOMES),
+        "xg": pd.to_numeric(column(events, "shot_statsbomb_xg")).where(is_type("Shot"), 0).fillna(0),
+        "passes_attempted": is_type("Pass"),
+        "passes_completed": is_type("Pass") & column(events, "pass_outcome").isna(),
+        "fouls": is_type("Foul Committed"),
+        "cards": card.notna(),
+    }, index=events.index)
+    totals = flags.groupby(events["team"], sort=False, observed=True).sum()
+    return totals.astype({col: int for col in totals.columns if col != "xg"})
@@ -0,0 +1,356 @@
+from soccer_stats import open_data
+from metrics import span
+from contextlib import contextmanager
+import pandas as pd
+import threading
+import shutil
+import json
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: the store is then only safe within one process
+    fcntl = None
+
+CACHE_DIR = os.getenv("SOCCER_STATS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "soccer_stats"))
+CACHE_MAX_MB = float(os.getenv("SOCCER_STATS_CACHE_MAX_MB", "512"))
+# last access times are only written to the manifest when older than this (seconds)
+ACCESS_RESOLUTION = 60
+# events are written in chronological order, small row groups let minute filters skip most of a file
+EVENTS_ROW_GROUP_SIZE = 500
+
+def encode_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, list]:
+    """
+    JSON-encode the object columns holding nested values (dicts, lists, bools),
+    so the frame can be written to Parquet with a stable schema
+    """
+    df = df.copy()
+    json_columns = []
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if values.map(lambda v: not isinstance(v, str)).any():
+            df[col] = df[col].map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) or not pd.isna(v) else None)
+            json_columns.append(col)
+    return df, json_columns
+
+def decode_frame(df: pd.DataFrame, json_columns: list) -> pd.DataFrame:
+    """
+    Reverse of `encode_frame`
+    """
+    for col in json_columns:
+        df[col] = df[col].map(lambda v: json.loads(v) if v is not None else None)
+    return df
+
+class MatchStore:
+    """
+    On-disk store of match data, one Parquet file per (kind, match_id), or a
+    directory of files for other formats (`put_dir`). A manifest keeps the
+    size and last access time of every entry, and the least recently used
+    entries are evicted once the store grows past `max_bytes`.
+
+    Several processes (e.g. API workers) can share a store: the manifest is
+    updated under a file lock and reloaded when another process changed it,
+    and files are read memory-mapped so the OS page cache is shared.
+    """
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024)):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.lock_path = os.path.join(root, "manifest.lock")
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.manifest_version = None
+        self.manifest = {}
+        self._reload()
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _stat_manifest(self) -> tuple | None:
+        try:
+            stat = os.stat(self.manifest_path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _reload(self):
+        """
+        Read the manifest again if another process wrote it since we last did
+        """
+        version = self._stat_manifest()
+        if version != self.manifest_version:
+            self.manifest = self._read_manifest()
+            self.manifest_version = version
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        self.manifest_version = self._stat_manifest()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the store lock, across threads and processes, with an up to date manifest
+        """
+        with self.lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._reload()
+            yield
+
+    def _key(self, kind: str, match_id: int) -> str:
+        return f"{kind}/{int(match_id)}.parquet"
+
+    def _dir_key(self, kind: str, match_id: int) -> str:
+        return f"{kind}/{int(match_id)}"
+
+    def path(self, kind: str, match_id: int) -> str:
+        return os.path.join(self.root, self._key(kind, match_id))
+
+    def dir_path(self, kind: str, match_id: int) -> str:
+        return os.path.join(self.root, self._dir_key(kind, match_id))
+
+    def _touch(self, entry: dict):
+        now = time.time()
+        if now - entry["last_access"] > ACCESS_RESOLUTION:
+            entry["last_access"] = now
+            self._write_manifest()
+
+    def _remove(self, key: str):
+        path = os.path.join(self.root, key)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def match_ids(self, kind: str) -> list[int]:
+        """
+        The matches with a stored frame of the given kind
+        """
+        prefix = f"{kind}/"
+        with self._locked():
+            return [
+                int(key[len(prefix):-len(".parquet")]) for key in self.manifest
+                if key.startswith(prefix) and key.endswith(".parquet") and "/" not in key[len(prefix):]
+            ]
+
+    def entry(self, kind: str, match_id: int) -> dict | None:
+        """
+        The manifest entry of a stored frame (size, last access, JSON encoded columns)
+        """
+        with self._locked():
+            return self.manifest.get(self._key(kind, match_id))
+
+    def version(self, kind: str, match_id: int) -> tuple | None:
+        """
+        (mtime, size) of a stored frame, which changes whenever any process
+        rewrites it, or None when it is not stored; a cheap cache key
+        """
+        try:
+            stat = os.stat(self.path(kind, match_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, kind: str, match_id: int, decode: bool = True) -> pd.DataFrame | None:
+        """
+        Read a stored frame, or None when it is not in the store. With
+        decode=False the nested columns are left as JSON strings (their names
+        are in the "json_columns" of the entry).
+        """
+        key = self._key(kind, match_id)
+        with self._locked():
+            entry = self.manifest.get(key)
+            if entry is None or not os.path.exists(self.path(kind, match_id)):
+                return None
+            self._touch(entry)
+        with span("serialize", step="parquet_read", kind=kind):
+            df = pd.read_parquet(self.path(kind, match_id), memory_map=True)
+            return decode_frame(df, entry["json_columns"]) if decode else df
+
+    def read(self, kind: str, match_id: int) -> pd.DataFrame | None:
+        """
+        Read a stored frame without recording the access, so worker processes
+        can read the store while only the parent process writes to it
+        """
+        entry = self._read_manifest().get(self._key(kind, match_id))
+        if entry is None or not os.path.exists(self.path(kind, match_id)):
+            return None
+        return decode_frame(pd.read_parquet(self.path(kind, match_id), memory_map=True), entry["json_columns"])
+
+    def put(self, kind: str, match_id: int, df: pd.DataFrame, row_group_size: int | None = None):
+        """
+        Write a frame to the store and evict old entries if needed
+        """
+        key = self._key(kind, match_id)
+        path = self.path(kind, match_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with span("serialize", step="parquet_write", kind=kind):
+            encoded, json_columns = encode_frame(df)
+            # one temp file per writer, threads of a process can write the same key at once
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            encoded.to_parquet(tmp_path, index=False, row_group_size=row_group_size)
+        os.replace(tmp_path, path)
+        with self._locked():
+            self.manifest[key] = {
+                "size": os.path.getsize(path),
+                "last_access": time.time(),
+                "json_columns": json_columns,
+            }
+            self._evict()
+            self._write_manifest()
+
+    def get_dir(self, kind: str, match_id: int) -> str | None:
+        """
+        The path of a stored directory, or None when it is not in the store
+        """
+        with self._locked():
+            entry = self.manifest.get(self._dir_key(kind, match_id))
+            if entry is None or not os.path.isdir(self.dir_path(kind, match_id)):
+                return None
+            self._touch(entry)
+        return self.dir_path(kind, match_id)
+
+    def put_dir(self, kind: str, match_id: int, tmp_path: str):
+        """
+        Move a directory of files written at `tmp_path` (under `dir_path`'s
+        parent, same filesystem) into the store and evict old entries if needed
+        """
+        key = self._dir_key(kind, match_id)
+        size = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+        with self._locked():
+            self._remove(key)
+            os.replace(tmp_path, self.dir_path(kind, match_id))
+            self.manifest[key] = {"size": size, "last_access": time.time(), "json_columns": []}
+            self._evict()
+            self._write_manifest()
+
+    def remove_dir(self, kind: str, match_id: int):
+        key = self._dir_key(kind, match_id)
+        with self._locked():
+            if key in self.manifest or os.path.exists(self.dir_path(kind, match_id)):
+                self._remove(key)
+                self.manifest.pop(key, None)
+                self._write_manifest()
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self.manifest.values())
+        for key, entry in sorted(self.manifest.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= entry["size"]
+            del self.manifest[key]
+
+    def clear(self):
+        """
+        Remove every file from the store
+        """
+        with self._locked():
+            for key in list(self.manifest):
+                self._remove(key)
+            self.manifest = {}
+            self._write_manifest()
+
+_store = None
+
+def get_store() -> MatchStore:
+    """
+    Get the process wide match store
+    """
+    global _store
+    if _store is None:
+        _store = MatchStore()
+    return _store
+
+def fetch_events(match_id: int) -> pd.DataFrame:
+    """
+    Fetch the events of a match from the open-data checkout (offline mode) or the StatsBomb API
+    """
+    with span("statsbomb", call="events"):
+        if open_data.is_offline():
+            return open_data.events(match_id)
+        from statsbombpy import sb
+        return sb.events(match_id=match_id)
+
+def fetch_lineups(match_id: int) -> dict:
+    """
+    Fetch the lineups of a match from the open-data checkout (offline mode) or the StatsBomb API
+    """
+    with span("statsbomb", call="lineups"):
+        if open_data.is_offline():
+            return open_data.lineups(match_id)
+        from statsbombpy import sb
+        return sb.lineups(match_id=match_id)
+
+def in_event_order(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    The events sorted by index, which is also period, minute and second order;
+    statsbombpy returns them grouped by type
+    """
+    if "index" not in events:
+        return events
+    return events.sort_values("index", kind="stable").reset_index(drop=True)
+
+def save_events(match_id: int, events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Write the events of a match to the local store, in event order, and return them as written
+    """
+    events = in_event_order(events)
+    get_store().put("events", match_id, events, row_group_size=EVENTS_ROW_GROUP_SIZE)
+    return events
+
+def save_lineups(match_id: int, lineups: dict):
+    """
+    Write the lineups of a match to the local store, as a single frame with a `team` column
+    """
+    get_store().put("lineups", match_id, pd.concat(
+        [df.assign(team=team) for team, df in lineups.items()], ignore_index=True
+    ))
+
+def cached_events(match_id: int) -> pd.DataFrame | None:
+    """
+    Get the events of a match from the local store, or None when they were never fetched
+    """
+    return get_store().get("events", match_id)
+
+def cached_lineups(match_id: int) -> dict | None:
+    """
+    Get the lineups of a match from the local store, or None when they were never fetched
+    """
+    lineups = get_store().get("lineups", match_id)
+    if lineups is None:
+        return None
+    return {
+        team: df.drop(columns="team").reset_index(drop=True)
+        for team, df in lineups.groupby("team", sort=False)
+    }
+
+def load_events(match_id: int) -> pd.DataFrame:
+    """
+    Get the events of a match, reading through the local store
+    """
+    events = cached_events(match_id)
+    if events is None:
+        events = save_events(match_id, fetch_events(match_id))
+    return events
+
+def load_lineups(match_id: int) -> dict:
+    """
+    Get the lineups of a match as a dict of team name -> DataFrame, reading through the local store
+    """
+    lineups = cached_lineups(match_id)
+    if lineups is None:
+        lineups = fetch_lineups(match_id)
+        save_lineups(match_id, lineups)
+    return lineups
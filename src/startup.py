@@ -0,0 +1,100 @@
+"""
+Startup profiling: how long the entry points take to import, and how long
+the app takes to be ready (FastAPI) or to paint its first page (Streamlit).
+
+Import times, per entry point and per top-level package, each entry point
+imported in a fresh interpreter:
+
+    python src/startup.py --output startup.json
+
+Time to ready / first paint, printed to stderr by the running app and kept
+in the "startup" timing of the metrics:
+
+    STARTUP_PROFILE=1 streamlit run src/app.py
+"""
+from metrics import metrics
+import subprocess
+import argparse
+import json
+import time
+import sys
+import os
+
+# the clock starts when this module is first imported, the entry points import it first
+STARTED = time.perf_counter()
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE") == "1"
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+# entry point -> (directory it runs from, module imported)
+ENTRY_POINTS = {
+    "fastapi": (os.path.join(SRC, "fastapi_app"), "main"),
+    "dashboard_data": (SRC, "soccer_stats.index"),
+    "tools": (SRC, "tools"),
+    "agent": (SRC, "agent"),
+}
+
+_marked = set()
+
+def mark(stage: str):
+    """
+    Record the seconds from process start to `stage` (e.g. "first_paint"), once per process
+    """
+    if stage in _marked:
+        return
+    _marked.add(stage)
+    seconds = time.perf_counter() - STARTED
+    metrics.observe("startup", seconds, stage=stage)
+    if STARTUP_PROFILE:
+        print(f"startup {stage}: {seconds * 1000:.0f} ms", file=sys.stderr)
+
+def import_times(directory: str, module: str) -> list[tuple[str, int, int]]:
+    """
+    (module, self µs, cumulative µs) of every module imported by `import module`, from `python -X importtime`
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+                            cwd=directory, env={**os.environ, "PYTHONPATH": os.pathsep.join([directory, SRC])},
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+def profile_imports(entry_points: dict = ENTRY_POINTS, top: int = 10) -> dict:
+    """
+    Import time of each entry point, with the packages taking the most of it
+    """
+    results = {}
+    for name, (directory, module) in entry_points.items():
+        times = import_times(directory, module)
+        packages = {}
+        for imported, self_us, _ in times:
+            package = imported.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        results[name] = {
+            "module": module,
+            "import_ms": round(next(c for m, _, c in times if m == module) / 1000, 1),
+            "modules": len(times),
+            "packages_ms": {package: round(us / 1000, 1) for package, us in slowest},
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the app entry points")
+    parser.add_argument("--entry-points", default=",".join(ENTRY_POINTS), help="comma separated: " + ", ".join(ENTRY_POINTS))
+    parser.add_argument("--top", type=int, default=10, help="slowest packages listed per entry point")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    args = parser.parse_args()
+    entry_points = {name.strip(): ENTRY_POINTS[name.strip()] for name in args.entry_points.split(",")}
+    output = json.dumps(profile_imports(entry_points, args.top), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
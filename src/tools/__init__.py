@@ -1,21 +1,40 @@
 from typing import List, Dict
-from langchain_core.tools import Tool
-from langchain_community.utilities import SerpAPIWrapper
-from .self_ask_agent import get_self_ask_agent, search_team_information
-from .soccer import get_specialist_comments, get_match_details
+from importlib import import_module
+from registry import registry
 
-def load_tools(tool_names: List[str] = []) -> Dict[str, Tool]:
+# every tool by name, with the module and attribute defining it: a tool's
+# module (and the libraries it needs) is only imported when the tool is loaded
+TOOL_SPECS = {
+    "search_team_information": ("tools.self_ask_agent", "search_team_information"),
+    "get_match_details": ("tools.soccer", "get_match_details"),
+    "get_specialist_comments": ("tools.soccer", "get_specialist_comments"),
+    "get_season_player_stats": ("tools.soccer", "get_season_player_stats"),
+    "Self-ask agent": ("tools.self_ask_agent", "self_ask_tool"),
+}
+
+def build_tool(name: str):
+    from metrics_callbacks import metrics_handler
+    module, attribute = TOOL_SPECS[name]
+    t = getattr(import_module(module), attribute)
+    t.callbacks = [metrics_handler]
+    return t
+
+def load_tool(name: str):
+    """
+    Load one tool by name, built once per process and shared
+    """
+    return registry.get(("tool", name), lambda: build_tool(name))
+
+def build_tools() -> List:
+    return [load_tool(name) for name in TOOL_SPECS]
+
+def load_tools(tool_names: List[str] = []) -> Dict:
     """
-    Load tools
+    Load tools, built once per process and shared. Without names every tool
+    is loaded, as a list; with names only those tools, by name.
     """
-    TOOLS = [
-        search_team_information,
-        get_match_details,
-        get_specialist_comments,
-        Tool.from_function(name='Self-ask agent',
-                           func=get_self_ask_agent().invoke,
-                           description="A tool to answer complicated questions. Useful for when you need to answer questions, get competitions events, team details, etc. Input should be a question."),
-    ]
     if tool_names == []:
-        return TOOLS
-    return {t.name: t for t in TOOLS if t.name in tool_names}
\ No newline at end of file
+        return registry.get("tools", build_tools)
+    if "tools" in registry.objects:
+        return {t.name: t for t in registry.objects["tools"] if t.name in tool_names}
+    return {name: load_tool(name) for name in tool_names if name in TOOL_SPECS}
@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+from caching import ResponseCache, content_key
+import threading
+import json
+import time
+import os
+import re
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "serpapi")
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "soccer_stats", "search.sqlite"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_RATE_PER_SECOND = float(os.getenv("SEARCH_RATE_PER_SECOND", "1"))
+SEARCH_BURST = int(os.getenv("SEARCH_BURST", "5"))
+SEARCH_STUB_PATH = os.getenv("SEARCH_STUB_PATH")
+
+def normalize_query(query: str) -> str:
+    """
+    Lower case, without punctuation and repeated whitespace, so near-identical
+    questions share a cache entry
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", str(query).lower()).split())
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: `rate` requests per second on average,
+    bursts of up to `capacity` requests
+    """
+    def __init__(self, rate: float = SEARCH_RATE_PER_SECOND, capacity: int = SEARCH_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, waiting until one is available
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class StubSearchBackend:
+    """
+    Offline search backend for tests: answers from a JSON file of
+    normalized query -> answer (SEARCH_STUB_PATH), or with a fixed text
+    """
+    def __init__(self, path: str | None = SEARCH_STUB_PATH):
+        self.answers = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.answers = {normalize_query(k): v for k, v in json.load(f).items()}
+
+    def run(self, query: str) -> str:
+        return self.answers.get(normalize_query(query), f"Nenhum resultado encontrado para: {query}")
+
+class CachedSearch:
+    """
+    Web search with a persistent TTL cache keyed on the normalized query,
+    a token bucket in front of the backend, and deduplication of concurrent
+    identical queries (only one reaches the backend, the others wait for it)
+    """
+    def __init__(self, backend, cache: ResponseCache | None = None, bucket: TokenBucket | None = None):
+        self.backend = backend
+        self.cache = cache or ResponseCache(SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL)
+        self.bucket = bucket or TokenBucket()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def run(self, query: str) -> str:
+        key = content_key("search", normalize_query(query))
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            self.bucket.acquire()
+            result = self.backend.run(query)
+            self.cache.set(key, result, tag="search")
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+def build_search_backend():
+    """
+    The search backend chosen by SEARCH_BACKEND ("serpapi" or "stub")
+    """
+    if SEARCH_BACKEND == "stub":
+        return StubSearchBackend()
+    from langchain_community.utilities import SerpAPIWrapper
+    return SerpAPIWrapper(serpapi_api_key=os.getenv('SERPAPI_API_KEY'))
@@ -1,33 +1,48 @@
-from langchain.agents import (AgentExecutor, Tool, create_self_ask_with_search_agent)
-from langchain import hub
-from langchain_google_genai import GoogleGenerativeAI
-from langchain_community.utilities import SerpAPIWrapper
-import os
+from langchain_core.tools import Tool
+from registry import registry, get_llm
+from .search import CachedSearch, build_search_backend
 
-def search_utility():
-    SERPAPI_API_KEY = os.getenv('SERPAPI_API_KEY')
-    return SerpAPIWrapper(serpapi_api_key=SERPAPI_API_KEY)
+def search_utility() -> CachedSearch:
+    """
+    Get the shared web search client (cached and rate limited), created on first use
+    """
+    return registry.get("search", lambda: CachedSearch(build_search_backend()))
+
+def web_search(query: str) -> str:
+    return search_utility().run(query)
 
 search_team_information = Tool(
     name='search_team_information',
-    func=search_utility().run,
+    func=web_search,
     description='Useful for when you need to search for information about a specific team or player',
 )
 
-def get_self_ask_agent() -> AgentExecutor:
-    """
-    Get the self ask agent
-    """
-    llm = GoogleGenerativeAI(model="gemini-pro", temperature=0.2)
+def build_self_ask_agent():
+    from langchain.agents import AgentExecutor, create_self_ask_with_search_agent
+    # same template as "hwchase17/self-ask-with-search" on the LangChain hub, shipped with the package
+    from langchain.agents.self_ask_with_search.prompt import PROMPT as SELF_ASK_PROMPT
+    llm = get_llm("gemini-pro", temperature=0.2)
     intermediate_search_tool = Tool(
         name='Intermediate Answer',
-        func=search_utility().run,
+        func=web_search,
         description='Search'
     )
-    prompt = hub.pull("hwchase17/self-ask-with-search")
     return AgentExecutor(
-        agent=create_self_ask_with_search_agent(llm, [intermediate_search_tool], prompt),
+        agent=create_self_ask_with_search_agent(llm, [intermediate_search_tool], SELF_ASK_PROMPT),
         tools = [intermediate_search_tool],
         handle_parsing_errors=True,
         verbose=True
-    )
\ No newline at end of file
+    )
+
+def get_self_ask_agent():
+    """
+    Get the self ask agent
+    """
+    return registry.get("self_ask_agent", build_self_ask_agent)
+
+def ask_self_ask_agent(question: str):
+    return get_self_ask_agent().invoke(question)
+
+self_ask_tool = Tool.from_function(name='Self-ask agent',
+                                   func=ask_self_ask_agent,
+                                   description="A tool to answer complicated questions. Useful for when you need to answer questions, get competitions events, team details, etc. Input should be a question.")
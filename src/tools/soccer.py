@@ -1,36 +1,34 @@
-from langchain.tools import tool
-from langchain.chains import LLMChain
-from langchain_google_genai import GoogleGenerativeAI
-from langchain.prompts import PromptTemplate
+from langchain_core.tools import tool
 import json
 import yaml
 
-from soccer_stats.competitions import get_matches
-from soccer_stats.matches import get_lineups, get_player_stats
+from soccer_stats.index import get_index
+from soccer_stats.matches import load_starting_11
+from soccer_stats.season import load_season_players, table_records
+from soccer_stats.models import LineupPlayer
+from caching import content_key, get_response_cache
+from registry import get_llm
 
-def filter_starting_11(line_ups: str) -> dict:
+SPECIALIST_MODEL = "gemini-pro"
+
+def filter_starting_11(line_ups: dict[str, list[LineupPlayer]]) -> dict:
     """
     Get the starting eleven players from provided lineups
 
     Args:
-        line_ups (str): The JSON string containing the lineups of the teams.
+        line_ups (dict): The players of each team, as returned by `load_match_lineups`.
     """
-    line_ups_dict = json.loads(line_ups)
     filtered_11 = {}
-    for team, team_line_up in line_ups_dict.items():
-        for player in sorted(team_line_up, key= lambda x: x["jersey_number"]):
-            try:
-                positions = player["positions"]["positions"]
-                if positions[0].get("start_reason") == "Starting XI":
-                    filtered_11[team].append(
-                        {
-                            "player" : player["player_name"],
-                            "position" : positions[0].get("position"),
-                            "jersey_number" : player["jersey_number"]
-                        }
-                    )
-            except (KeyError, IndexError):
-                continue
+    for team, team_line_up in line_ups.items():
+        filtered_11[team] = [
+            {
+                "player" : player.player_name,
+                "position" : player.positions[0].position,
+                "jersey_number" : player.jersey_number
+            }
+            for player in sorted(team_line_up, key= lambda x: x.jersey_number)
+            if player.is_starter
+        ]
     return filtered_11
 
 def pull_match_details(action_input: str) -> str:
@@ -45,23 +43,18 @@ def pull_match_details(action_input: str) -> str:
                 "season_id": 02
             }
     '''
-    match_id = json.loads(action_input)["match_id"]
-    competition_id = json.loads(action_input)["competition_id"]
-    season_id = json.loads(action_input)["season_id"]
-    matches = json.loads(get_matches(competition_id, season_id))
-    match_details = next(
-        (match for match in matches if match["match_id"] == int(match_id)),
-    None
-    )
-    return match_details
+    action_data = json.loads(action_input)
+    return get_index().get_match(action_data["match_id"], action_data["competition_id"], action_data["season_id"])
 
 
 
-def create_specialist_comments(match_details: str, line_ups: str, narration_style: str) -> str:
+def create_specialist_comments(match_details: dict, line_ups: dict[str, list[dict]], narration_style: str) -> str:
     """
     Uses an LLM to simulate the comments of a sports specialist about a specific match.
+
+    Args:
+        line_ups (dict): The starting eleven of each team, as returned by `load_starting_11`.
     """
-    line_ups = filter_starting_11(line_ups)
 
     agent_prompt = """
     You must work strictly on Brazilian Portuguese PT-BR.
@@ -104,13 +97,20 @@ def create_specialist_comments(match_details: str, line_ups: str, narration_styl
     #Exemplo inicial de resposta:
     - 'Olá torcedores, estamos aqui para mais um grande jogo de futebol. Hoje, (time1) enfrenta (team2) em uma partida decisiva. O vencedor segue para a grande final (...)'
     """
-    llm = GoogleGenerativeAI(model="gemini-pro")
     input_variables={"match_details": yaml.dump(match_details),
                      "line_ups": yaml.dump(line_ups),
                      "narration_style": narration_style}
-    prompt = PromptTemplate.from_template(agent_prompt)
-    chain = LLMChain(llm=llm, prompt=prompt, verbose=True)
-    return chain.run(**input_variables)
+
+    def run_chain():
+        from langchain.chains import LLMChain
+        from langchain.prompts import PromptTemplate
+        llm = get_llm(SPECIALIST_MODEL)
+        prompt = PromptTemplate.from_template(agent_prompt)
+        chain = LLMChain(llm=llm, prompt=prompt, verbose=True)
+        return chain.run(**input_variables)
+
+    key = content_key(agent_prompt, SPECIALIST_MODEL, input_variables)
+    return get_response_cache().get_or_compute(key, run_chain, tag=f"match:{match_details['match_id']}")
 
 @tool
 def get_match_details(action_input:str) -> str:
@@ -147,7 +147,26 @@ def get_specialist_comments(action_input: str) -> str:
         "competition_id": action_data["competition_id"],
         "season_id": action_data["season_id"]
     }))
-    line_ups = get_lineups(match_details["match_id"])
+    line_ups = load_starting_11(match_details["match_id"])
     narration_style = action_data["narration_style"]
 
-    return create_specialist_comments(match_details, line_ups, narration_style)
\ No newline at end of file
+    return create_specialist_comments(match_details, line_ups, narration_style)
+
+@tool
+def get_season_player_stats(action_input: str) -> str:
+    """
+    Retrieve the season totals and per 90 minutes stats of a player over every match of a season
+
+    Args:
+        - action_input(str): The input data containing the competition_id, season_id and player_name.
+          format: {
+              "competition_id": 123,
+              "season_id": 02,
+              "player_name": "Lionel Andrés Messi Cuccittini"
+              }
+    """
+    action_data = json.loads(action_input)
+    table = load_season_players(action_data["competition_id"], action_data["season_id"])
+    if table.empty or action_data["player_name"] not in table.index.get_level_values("player"):
+        return f"No matches found for player {action_data['player_name']} in this season"
+    return yaml.dump(table_records(table.xs(action_data["player_name"], level="player", drop_level=False)))
@@ -0,0 +1,24 @@
+import tempfile
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+# the app modules read their settings at import time: point every cache and
+# data source to a scratch directory with generated open-data fixtures first
+WORKDIR = tempfile.mkdtemp(prefix="soccer_stats_tests_")
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from fixtures import generate
+
+OPEN_DATA_DIR = generate(os.path.join(WORKDIR, "open-data"), n_matches=2, n_events=1200)
+os.environ.update({
+    "STATSBOMB_OPEN_DATA_DIR": OPEN_DATA_DIR,
+    "SOCCER_STATS_CACHE_DIR": os.path.join(WORKDIR, "store"),
+    "LLM_CACHE_PATH": os.path.join(WORKDIR, "llm_responses.sqlite"),
+    "JOBS_PATH": os.path.join(WORKDIR, "jobs.sqlite"),
+    "SEARCH_BACKEND": "stub",
+    "SEARCH_CACHE_PATH": os.path.join(WORKDIR, "search.sqlite"),
+    "GOOGLE_API_KEY": "test",
+})
+sys.path[:0] = [SRC, os.path.join(SRC, "fastapi_app")]
@@ -0,0 +1,30 @@
+from admission import AdmissionController, SlotStreamingResponse
+import asyncio
+import pytest
+
+async def client_gone(message):
+    raise OSError("connection reset")
+
+async def no_message():
+    return {"type": "http.disconnect"}
+
+def test_slot_released_when_client_leaves_before_the_body():
+    async def run():
+        controller = AdmissionController(limit=1, max_queue=0, queue_timeout=0.1)
+        started = []
+
+        async def body():
+            started.append(True)
+            yield "token"
+
+        await controller.acquire()
+        response = SlotStreamingResponse(body(), controller, media_type="text/event-stream")
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(Exception):
+            await response(scope, no_message, client_gone)
+        assert not started
+        assert controller.stats()["active"] == 0
+        # the slot can be taken again
+        await asyncio.wait_for(controller.acquire(), 1)
+
+    asyncio.run(run())
@@ -0,0 +1,13 @@
+from soccer_stats import compact
+from soccer_stats.compact import load_compact, remove_compact
+from soccer_stats.store import MatchStore, load_events
+import shutil
+
+def test_events_when_the_compact_files_are_lost(monkeypatch):
+    remove_compact(1001)
+    # evicted as soon as written
+    monkeypatch.setattr(MatchStore, "put_dir", lambda self, kind, match_id, tmp_path: shutil.rmtree(tmp_path))
+    events = load_compact(1001)
+    assert len(events) == len(load_events(1001))
+    assert events.records_at([0])[0]["index"] == 1
+    assert compact.read_compact(1001) is None
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from main import app
+from soccer_stats import open_data
+from soccer_stats.store import get_store, load_events, save_events
+
+MATCH_ID = 1001
+
+def test_pages_return_every_event_once():
+    expected = sorted(event["index"] for event in open_data.read_json("events", f"{MATCH_ID}.json"))
+    seen = []
+    cursor = None
+    with TestClient(app) as client:
+        while True:
+            params = {"limit": 300, "fields": ["index", "type"]}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = client.get(f"/matches/{MATCH_ID}/events", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            indexes = [event["index"] for event in page["events"]]
+            assert indexes == sorted(indexes)
+            seen += indexes
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    assert seen == expected
+
+def test_pages_of_files_grouped_by_type():
+    # event files written before they were stored in index order
+    events = load_events(MATCH_ID)
+    get_store().put("events", MATCH_ID, events.sort_values("type", kind="stable"))
+    try:
+        test_pages_return_every_event_once()
+    finally:
+        save_events(MATCH_ID, events)
+
+def test_etag_follows_rewritten_events():
+    with TestClient(app) as client:
+        etag = client.get(f"/matches/{MATCH_ID}/events", params={"limit": 10}).headers["ETag"]
+        assert client.get(f"/matches/{MATCH_ID}/events", params={"limit": 10},
+                          headers={"If-None-Match": etag}).status_code == 304
+        save_events(MATCH_ID, load_events(MATCH_ID))
+        response = client.get(f"/matches/{MATCH_ID}/events", params={"limit": 10}, headers={"If-None-Match": etag})
+        assert response.status_code == 200 and response.headers["ETag"] != etag
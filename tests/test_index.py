@@ -0,0 +1,11 @@
+from soccer_stats.index import MatchIndex
+
+def test_matches_of_a_team():
+    index = MatchIndex()
+    matches = index.get_matches(43, 3)
+    team = matches[0]["home_team"]
+    expected = sorted(match["match_id"] for match in matches if team in (match["home_team"], match["away_team"]))
+    assert sorted(match["match_id"] for match in index.get_team_matches(team, 43, 3)) == expected
+    assert [match["match_id"] for match in index.get_team_matches(team)] == [
+        match["match_id"] for match in index.get_team_matches(team, 43, 3)]
+    assert index.get_team_matches("No Such Team") == []
@@ -0,0 +1,20 @@
+from conftest import WORKDIR
+from soccer_stats import ingest, store
+from soccer_stats.store import MatchStore
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+def test_concurrent_misses_ingest_a_match_once(monkeypatch):
+    monkeypatch.setattr(store, "_store", MatchStore(os.path.join(WORKDIR, "store_cold")))
+    ingested = []
+
+    def ingest_match(match_id):
+        ingested.append(match_id)
+        return ingest.materialize(match_id, store.load_events(match_id), store.load_lineups(match_id))
+
+    monkeypatch.setattr(ingest, "ingest_match", ingest_match)
+    names = ["xg_timeline", "heatmap", "player_stats", "team_totals"] * 2
+    with ThreadPoolExecutor(len(names)) as executor:
+        tables = list(executor.map(lambda name: ingest.get_table(1001, name), names))
+    assert ingested == [1001]
+    assert all(table is not None for table in tables)
@@ -0,0 +1,87 @@
+from conftest import WORKDIR
+from jobs import JobQueue, JobRunner, RetryJob
+import asyncio
+import time
+import os
+
+def test_submit_from_a_thread_wakes_the_runner():
+    async def run():
+        queue = JobQueue(os.path.join(WORKDIR, "jobs_wake.sqlite"))
+
+        async def echo(text):
+            return text
+
+        # a long poll interval: only the submitted event can start the job in time
+        runner = JobRunner(queue, {"echo": echo}, concurrency=1, poll_interval=30)
+        runner.start()
+        try:
+            await asyncio.sleep(0.05)
+            job = await asyncio.to_thread(queue.submit, "echo", {"text": "hello"})
+            job = await queue.wait(job["id"], 5)
+            assert job["status"] == "done" and job["result"] == "hello"
+        finally:
+            await runner.stop()
+            queue.close()
+
+    asyncio.run(run())
+
+def test_purge_only_removes_old_finished_jobs():
+    queue = JobQueue(os.path.join(WORKDIR, "jobs_purge.sqlite"))
+    done = queue.submit("echo", {"text": "done"})
+    assert queue.claim(["echo"])["id"] == done["id"]
+    queue.finish(done["id"], result="done")
+    cancelled = queue.submit("echo", {"text": "cancelled"})
+    queue.cancel(cancelled["id"])
+    pending = queue.submit("echo", {"text": "pending"})
+    time.sleep(0.01)
+    assert queue.purge(older_than=0) == 2
+    assert queue.get(done["id"]) is None and queue.get(cancelled["id"]) is None
+    assert queue.get(pending["id"])["status"] == "pending"
+    queue.close()
+
+def test_retried_job_waits_for_its_delay():
+    async def run():
+        queue = JobQueue(os.path.join(WORKDIR, "jobs_retry.sqlite"))
+        attempts = []
+
+        async def busy(text):
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryJob(0.5)
+            return text
+
+        runner = JobRunner(queue, {"busy": busy}, concurrency=2, poll_interval=0.05)
+        runner.start()
+        try:
+            job = await asyncio.to_thread(queue.submit, "busy", {"text": "done"})
+            job = await queue.wait(job["id"], 5)
+            assert job["status"] == "done"
+            assert len(attempts) == 2 and attempts[1] - attempts[0] >= 0.45
+        finally:
+            await runner.stop()
+            queue.close()
+
+    asyncio.run(run())
+
+def test_long_job_keeps_its_lease():
+    async def run():
+        queue = JobQueue(os.path.join(WORKDIR, "jobs_lease.sqlite"), lease=0.3)
+        started = []
+
+        async def slow(text):
+            started.append(text)
+            await asyncio.sleep(1)
+            return text
+
+        runner = JobRunner(queue, {"slow": slow}, concurrency=2, poll_interval=0.05)
+        runner.start()
+        try:
+            job = await asyncio.to_thread(queue.submit, "slow", {"text": "done"})
+            job = await queue.wait(job["id"], 5)
+            assert job["status"] == "done" and job["attempts"] == 1
+            assert started == ["done"]
+        finally:
+            await runner.stop()
+            queue.close()
+
+    asyncio.run(run())
@@ -0,0 +1,25 @@
+from soccer_stats.ingest import materialize
+from soccer_stats.matches import load_player_stats
+from soccer_stats.stats import compute_player_stats_table, compute_team_totals
+from soccer_stats.store import load_events, load_lineups
+
+MATCH_ID = 1002
+
+def test_stats_follow_rewritten_tables():
+    events = load_events(MATCH_ID)
+    player = events.loc[events["type"] == "Pass", "player"].iloc[0]
+    passes = load_player_stats(MATCH_ID, player).passes_attempted
+    assert passes > 0
+    # e.g. a live match finished or a season prefetched again with --force
+    materialize(MATCH_ID, events[~((events["type"] == "Pass") & (events["player"] == player))],
+                load_lineups(MATCH_ID))
+    assert load_player_stats(MATCH_ID, player).passes_attempted == 0
+    materialize(MATCH_ID, events, load_lineups(MATCH_ID))
+    assert load_player_stats(MATCH_ID, player).passes_attempted == passes
+
+def test_player_shots_on_target_add_up_to_the_team_totals():
+    events = load_events(MATCH_ID)
+    players = compute_player_stats_table(events)
+    teams = compute_team_totals(events)
+    assert teams["shots_on_target"].sum() > 0
+    assert players["shots_on_target"].sum() == teams["shots_on_target"].sum()
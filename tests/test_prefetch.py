@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+from main import app
+import json
+
+COMPETITION_ID, SEASON_ID = 43, 3
+
+def test_prefetch_runs_once_and_reports_from_the_queue():
+    with TestClient(app) as client:
+        first = client.post(f"/prefetch/{COMPETITION_ID}/{SEASON_ID}").json()
+        second = client.post(f"/prefetch/{COMPETITION_ID}/{SEASON_ID}").json()
+        if first["status"] in ("pending", "running"):
+            assert second["id"] == first["id"]
+        job = client.get(f"/jobs/{first['id']}", params={"wait": 10}).json()
+        assert job["status"] == "done"
+        assert json.loads(job["result"])["competition_id"] == COMPETITION_ID
+        client.get(f"/jobs/{second['id']}", params={"wait": 10})
+        status = client.get(f"/prefetch/{COMPETITION_ID}/{SEASON_ID}").json()
+        assert status["status"] == "done" and status["kind"] == "prefetch_season"
+        assert client.get(f"/prefetch/{COMPETITION_ID}/999").json() == {"status": "not started"}
@@ -0,0 +1,19 @@
+from conftest import WORKDIR
+from soccer_stats import store
+from soccer_stats.query import EventFilter, query_events
+from soccer_stats.store import MatchStore
+import pandas as pd
+import os
+
+def test_columns_decoded_per_match(monkeypatch):
+    monkeypatch.setattr(store, "_store", MatchStore(os.path.join(WORKDIR, "store_query")))
+    # "tag" holds plain strings in one match and nested values in the other
+    store.save_events(1, pd.DataFrame({"index": [1, 2], "match_id": 1, "tag": ["[1]", "plain"]}))
+    store.save_events(2, pd.DataFrame({"index": [1, 2], "match_id": 2, "tag": [[1, 2], None]}))
+    events = query_events(EventFilter(match_ids=(1, 2)))
+    tags = {(row.match_id, row.index): row.tag for row in events.itertuples()}
+    assert tags == {(1, 1): "[1]", (1, 2): "plain", (2, 1): [1, 2], (2, 2): None}
+    # without the match_id column in the result
+    projected = query_events(EventFilter(match_ids=(1, 2)), ["index", "tag"])
+    assert list(projected.columns) == ["index", "tag"]
+    assert projected["tag"].tolist() == events["tag"].tolist()
@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+from main import app
+from soccer_stats.ingest import materialize
+from soccer_stats.season import scan_seasons
+from soccer_stats.store import load_events, load_lineups
+
+COMPETITION_ID, SEASON_ID = 43, 3
+
+def test_season_totals_cached_until_a_match_changes():
+    with TestClient(app) as client:
+        first = client.get(f"/seasons/{COMPETITION_ID}/{SEASON_ID}/teams")
+        assert first.status_code == 200
+        players, teams = scan_seasons([(COMPETITION_ID, SEASON_ID)])
+        # same objects: served from the cache, no scan
+        assert scan_seasons([(COMPETITION_ID, SEASON_ID)])[1] is teams
+        assert client.get(f"/seasons/{COMPETITION_ID}/{SEASON_ID}/teams").json() == first.json()
+
+        events = load_events(1001)
+        materialize(1001, events[events["type"] != "Shot"], load_lineups(1001))
+        try:
+            changed = scan_seasons([(COMPETITION_ID, SEASON_ID)])[1]
+            assert changed is not teams
+            assert changed["shots"].sum() < teams["shots"].sum()
+        finally:
+            materialize(1001, events, load_lineups(1001))
@@ -0,0 +1,11 @@
+from soccer_stats.spatial import xg_timeline_table
+from soccer_stats.store import load_events
+import pandas as pd
+
+def test_xg_timeline_leaves_out_the_shootout():
+    events = load_events(1001)
+    shot = events[events["type"] == "Shot"].iloc[[0]]
+    shootout = shot.assign(period=5, minute=120, second=30, shot_statsbomb_xg=0.76, shot_outcome="Goal")
+    timeline = xg_timeline_table(pd.concat([events, shootout], ignore_index=True))
+    assert timeline.equals(xg_timeline_table(events))
+    assert (timeline["period"] < 5).all()
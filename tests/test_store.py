@@ -0,0 +1,19 @@
+from conftest import WORKDIR
+from soccer_stats.store import MatchStore
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import os
+
+def test_concurrent_puts_of_the_same_key():
+    store = MatchStore(os.path.join(WORKDIR, "store_concurrent"))
+    frames = [pd.DataFrame({"index": range(100), "writer": writer}) for writer in range(4)]
+
+    def put(frame):
+        for _ in range(20):
+            store.put("events", 1, frame)
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(put, frames))
+    stored = store.get("events", 1)
+    assert len(stored) == 100 and stored["writer"].nunique() == 1
+    assert os.listdir(os.path.dirname(store.path("events", 1))) == ["1.parquet"]